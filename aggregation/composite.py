@@ -0,0 +1,171 @@
+import psycopg2
+import os
+import sys
+from dotenv import load_dotenv
+from pathlib import Path
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+load_dotenv(BASE_DIR / "config" / "setting.env")
+
+from aggregation.mv_ohlc import TIMEFRAMES
+
+DB_PARAMS = {
+    "dbname": os.getenv("DB_NAME"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host": os.getenv("DB_HOST"),
+    "port": os.getenv("DB_PORT"),
+}
+
+def get_conn():
+    return psycopg2.connect(**DB_PARAMS)
+
+# =========================================================
+# PENDING
+# =========================================================
+#
+# Every exchange's rollups share the dim_time bucket grid, so a composite
+# bucket is a plain GROUP BY tf_time. gold.composite_watermark remembers,
+# per exchange, how far its rollup has been folded in; an exchange that
+# lags behind the others is picked up from its own watermark once it
+# catches up.
+
+def get_pending(conn, tf):
+    # (symbol, exchanges, their rollup watermarks, first bucket to rebuild)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT
+                r.symbol,
+                array_agg(r.exchange ORDER BY r.exchange),
+                array_agg(r.last_timestamp ORDER BY r.exchange),
+                MIN(COALESCE(t.{TIMEFRAMES[tf]["key"]}, 0)) FILTER (
+                    WHERE r.last_timestamp > COALESCE(c.last_timestamp, 0)
+                )
+            FROM silver.rollup_watermark r
+            LEFT JOIN gold.composite_watermark c
+              ON c.symbol = r.symbol
+             AND c.exchange = r.exchange
+             AND c.timeframe = r.timeframe
+            LEFT JOIN silver.dim_time t
+              ON t.epoch = c.last_timestamp
+            WHERE r.timeframe = %s
+            GROUP BY r.symbol
+            HAVING bool_or(r.last_timestamp > COALESCE(c.last_timestamp, 0))
+            ORDER BY r.symbol
+        """, (tf,))
+        return cur.fetchall()
+
+# =========================================================
+# BUILD
+# =========================================================
+
+def build_composite(conn, tf, symbol, exchanges, targets, from_key):
+    # rebuild every bucket from from_key on, across all of the symbol's
+    # exchanges; a bucket with no volume falls back to plain averages
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            WITH bars AS (
+                SELECT
+                    symbol,
+                    exchange,
+                    tf_time,
+                    open,
+                    high,
+                    low,
+                    close,
+                    volume,
+                    COALESCE(
+                        SUM(close * volume) OVER w / NULLIF(SUM(volume) OVER w, 0),
+                        AVG(close) OVER w
+                    ) AS composite_close
+                FROM silver.ohlc_{tf}
+                WHERE symbol = %(symbol)s
+                  AND exchange = ANY(%(exchanges)s)
+                  AND tf_time >= to_timestamp(%(from_key)s / 1000.0)
+                WINDOW w AS (PARTITION BY tf_time)
+            )
+            INSERT INTO gold.composite_{tf} (
+                symbol,
+                tf_time,
+                open,
+                high,
+                low,
+                close,
+                volume,
+                exchanges,
+                spread,
+                divergence
+            )
+            SELECT
+                symbol,
+                tf_time,
+                COALESCE(SUM(open * volume) / NULLIF(SUM(volume), 0), AVG(open)),
+                COALESCE(SUM(high * volume) / NULLIF(SUM(volume), 0), AVG(high)),
+                COALESCE(SUM(low * volume)  / NULLIF(SUM(volume), 0), AVG(low)),
+                MAX(composite_close),
+                SUM(volume),
+                COUNT(*),
+                MAX(close) - MIN(close),
+                jsonb_object_agg(exchange, close / NULLIF(composite_close, 0) - 1)
+            FROM bars
+            GROUP BY symbol, tf_time
+            ON CONFLICT (symbol, tf_time) DO UPDATE
+            SET open       = EXCLUDED.open,
+                high       = EXCLUDED.high,
+                low        = EXCLUDED.low,
+                close      = EXCLUDED.close,
+                volume     = EXCLUDED.volume,
+                exchanges  = EXCLUDED.exchanges,
+                spread     = EXCLUDED.spread,
+                divergence = EXCLUDED.divergence
+        """, {
+            "symbol": symbol,
+            "exchanges": exchanges,
+            "from_key": from_key,
+        })
+        upserted = cur.rowcount
+
+        # advance in the same transaction as the upsert
+        for exchange, target_ts in zip(exchanges, targets):
+            cur.execute("""
+                INSERT INTO gold.composite_watermark (
+                    symbol,
+                    exchange,
+                    timeframe,
+                    last_timestamp
+                )
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (symbol, exchange, timeframe) DO UPDATE
+                SET last_timestamp = EXCLUDED.last_timestamp,
+                    updated_at = now()
+            """, (symbol, exchange, tf, target_ts))
+
+    conn.commit()
+    return upserted
+
+# =========================================================
+# RUN
+# =========================================================
+
+def build_timeframe(conn, tf):
+    total = 0
+    for symbol, exchanges, targets, from_key in get_pending(conn, tf):
+        total += build_composite(conn, tf, symbol, exchanges, targets, from_key)
+    print(f"[composite_{tf}] upserted {total} bars")
+    return total
+
+
+def run():
+    conn = get_conn()
+
+    for tf in TIMEFRAMES:
+        build_timeframe(conn, tf)
+
+    conn.close()
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,155 @@
+import psycopg2
+import os
+import sys
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+from pathlib import Path
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+load_dotenv(BASE_DIR / "config" / "setting.env")
+
+from aggregation.mv_ohlc import TIMEFRAMES
+from utils.ohlc_reader import OHLC_COLUMNS, export_path, fetch_ohlc
+
+DB_PARAMS = {
+    "dbname": os.getenv("DB_NAME"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host": os.getenv("DB_HOST"),
+    "port": os.getenv("DB_PORT"),
+}
+
+def get_conn():
+    return psycopg2.connect(**DB_PARAMS)
+
+# =========================================================
+# PENDING
+# =========================================================
+#
+# Only closed bars are exported: a bar still open is rewritten by every
+# feature run, while a closed one never changes again. The export
+# watermark is the tf_time of the newest bar written, and each run
+# fetches just the closed bars after it.
+
+EXPORT_SCHEMA = pa.schema([
+    ("tf_time", pa.timestamp("us", tz="UTC")),
+    *((c, pa.float64()) for c in OHLC_COLUMNS),
+])
+
+
+def get_pending(conn, tf):
+    # (symbol, exchange, last exported tf_time, start of the open bar)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT
+                g.symbol,
+                g.exchange,
+                e.last_tf_time,
+                t.{TIMEFRAMES[tf]["key"]}
+            FROM gold.feature_watermark g
+            JOIN silver.dim_time t
+              ON t.epoch = g.last_timestamp
+            LEFT JOIN gold.export_watermark e
+              ON e.symbol = g.symbol
+             AND e.exchange = g.exchange
+             AND e.timeframe = g.timeframe
+            WHERE g.timeframe = %s
+              AND t.{TIMEFRAMES[tf]["key"]} > COALESCE(e.last_tf_time + 1, 0)
+            ORDER BY g.exchange, g.symbol
+        """, (tf,))
+        return cur.fetchall()
+
+# =========================================================
+# WRITE
+# =========================================================
+
+def write_month(path, table):
+    """Append `table` to the month file at `path`.
+
+    Rows already in the file at or after the first new bar are dropped
+    first, so re-exporting after a crash before the watermark commit does
+    not duplicate bars. The file is replaced atomically.
+    """
+    if path.exists():
+        old = pq.read_table(path, memory_map=True)
+        old_time = old["tf_time"].to_numpy().astype("datetime64[us]")
+        first = table["tf_time"][0].value
+        keep = np.searchsorted(old_time, np.datetime64(first, "us"), "left")
+        table = pa.concat_tables([old.slice(0, keep), table])
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def export_bars(conn, tf, symbol, exchange, last_tf_time, open_bucket):
+    start = None if last_tf_time is None else last_tf_time + 1
+
+    with conn.cursor() as cur:
+        columns = fetch_ohlc(cur, symbol, exchange, tf, start, open_bucket - 1)
+
+    tf_time = columns["tf_time"]
+    if not len(tf_time):
+        return 0
+
+    table = pa.table(
+        [pa.array(tf_time).cast(EXPORT_SCHEMA.field("tf_time").type)]
+        + [pa.array(columns[c]) for c in OHLC_COLUMNS],
+        schema=EXPORT_SCHEMA,
+    )
+
+    # one file per UTC month of tf_time
+    months = tf_time.astype("datetime64[M]")
+    bounds = np.flatnonzero(months[1:] != months[:-1]) + 1
+    for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(tf_time)]):
+        path = export_path(tf, symbol, exchange, str(months[lo]))
+        write_month(path, table.slice(lo, hi - lo))
+
+    # advanced only once the files are in place
+    last = int(tf_time[-1].astype("datetime64[ms]").astype(np.int64))
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO gold.export_watermark (
+                symbol,
+                exchange,
+                timeframe,
+                last_tf_time
+            )
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (symbol, exchange, timeframe) DO UPDATE
+            SET last_tf_time = EXCLUDED.last_tf_time,
+                updated_at = now()
+        """, (symbol, exchange, tf, last))
+    conn.commit()
+
+    return len(tf_time)
+
+# =========================================================
+# RUN
+# =========================================================
+
+def export_timeframe(conn, tf):
+    total = 0
+    for symbol, exchange, last_tf_time, open_bucket in get_pending(conn, tf):
+        total += export_bars(conn, tf, symbol, exchange, last_tf_time, open_bucket)
+    print(f"[export_{tf}] wrote {total} bars")
+    return total
+
+
+def run():
+    conn = get_conn()
+
+    for tf in TIMEFRAMES:
+        export_timeframe(conn, tf)
+
+    conn.close()
+
+if __name__ == '__main__':
+    run()
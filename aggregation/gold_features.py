@@ -0,0 +1,220 @@
+import psycopg2
+import os
+import sys
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from dotenv import load_dotenv
+from pathlib import Path
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+load_dotenv(BASE_DIR / "config" / "setting.env")
+
+from utils.bulk_loader import copy_merge
+from aggregation.mv_ohlc import TIMEFRAMES
+
+DB_PARAMS = {
+    "dbname": os.getenv("DB_NAME"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host": os.getenv("DB_HOST"),
+    "port": os.getenv("DB_PORT"),
+}
+
+def get_conn():
+    return psycopg2.connect(**DB_PARAMS)
+
+FEATURE_WINDOW = int(os.getenv("FEATURE_WINDOW", 20))  # bars per rolling metric
+
+# =========================================================
+# METRICS
+# =========================================================
+
+def rolling(x, window, fn):
+    # fn over each trailing window; NaN until the first full window
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = fn(sliding_window_view(x, window), axis=-1)
+    return out
+
+
+def compute_features(high, low, close, volume, window=FEATURE_WINDOW):
+    """Derived metrics for consecutive bars, one NumPy array each.
+
+    Every metric at bar i depends only on bars i - window .. i, so
+    recomputing new bars needs just `window` bars of look-back. ATR is
+    the plain mean true range over the window, not Wilder's recursive
+    smoothing, to keep that bound.
+    """
+    prev_close = np.r_[np.nan, close[:-1]]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_change = (close - prev_close) / np.where(prev_close == 0, np.nan, prev_close)
+        log_return = np.log(close / prev_close)
+
+        true_range = np.fmax(
+            high - low,
+            np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)),
+        )
+        typical = (high + low + close) / 3
+        rolling_volume = rolling(volume, window, np.sum)
+        vwap = rolling(typical * volume, window, np.sum) / np.where(
+            rolling_volume == 0, np.nan, rolling_volume
+        )
+
+    return {
+        "pct_change": pct_change,
+        "log_return": log_return,
+        "volatility": rolling(log_return, window, lambda w, axis: np.std(w, axis=axis, ddof=1)),
+        "vwap": vwap,
+        "atr": rolling(true_range, window, np.mean),
+        "rolling_volume": rolling_volume,
+    }
+
+# =========================================================
+# INCREMENTAL BUILD
+# =========================================================
+
+BAR_COLUMNS = ("tf_time", "open", "high", "low", "close", "volume")
+FEATURE_COLUMNS = (
+    "pct_change",
+    "log_return",
+    "volatility",
+    "vwap",
+    "atr",
+    "rolling_volume",
+)
+FEATURE_KEY = ("symbol", "exchange", "tf_time")
+
+
+def get_pending(conn, tf):
+    # instruments whose rollup moved past their features; from_key is the
+    # bucket of the last minute reflected, so a bar still open is redone
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT
+                r.symbol,
+                r.exchange,
+                r.last_timestamp,
+                COALESCE(t.{TIMEFRAMES[tf]["key"]}, 0)
+            FROM silver.rollup_watermark r
+            LEFT JOIN gold.feature_watermark g
+              ON g.symbol = r.symbol
+             AND g.exchange = r.exchange
+             AND g.timeframe = r.timeframe
+            LEFT JOIN silver.dim_time t
+              ON t.epoch = g.last_timestamp
+            WHERE r.timeframe = %s
+              AND r.last_timestamp > COALESCE(g.last_timestamp, 0)
+            ORDER BY r.exchange, r.symbol
+        """, (tf,))
+        return cur.fetchall()
+
+
+def get_bars(conn, tf, symbol, exchange, from_key, window=FEATURE_WINDOW):
+    # bars from from_key on, preceded by `window` bars of look-back;
+    # both halves are range scans on the rollup's primary key
+    cols = ", ".join(BAR_COLUMNS)
+
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT {cols}
+            FROM (
+                SELECT {cols}
+                FROM silver.ohlc_{tf}
+                WHERE symbol = %(symbol)s
+                  AND exchange = %(exchange)s
+                  AND tf_time < to_timestamp(%(from_key)s / 1000.0)
+                ORDER BY tf_time DESC
+                LIMIT %(window)s
+            ) tail
+            UNION ALL
+            SELECT {cols}
+            FROM silver.ohlc_{tf}
+            WHERE symbol = %(symbol)s
+              AND exchange = %(exchange)s
+              AND tf_time >= to_timestamp(%(from_key)s / 1000.0)
+            ORDER BY tf_time
+        """, {
+            "symbol": symbol,
+            "exchange": exchange,
+            "from_key": from_key,
+            "window": window,
+        })
+        return cur.fetchall()
+
+
+def build_features(conn, tf, symbol, exchange, target_ts, from_key):
+    bars = get_bars(conn, tf, symbol, exchange, from_key)
+    if not bars:
+        return 0
+
+    tf_time = [b[0] for b in bars]
+    open_, high, low, close, volume = np.array([b[1:] for b in bars], dtype=np.float64).T
+    features = compute_features(high, low, close, volume)
+
+    # only bars at or after from_key are written; the tail was look-back
+    start = next(
+        (i for i, t in enumerate(tf_time) if t.timestamp() * 1000 >= from_key),
+        len(bars),
+    )
+    values = np.column_stack([features[c] for c in FEATURE_COLUMNS])
+    metrics = values.astype(object)
+    metrics[np.isnan(values)] = None  # NaN → NULL
+
+    rows = [
+        (symbol, exchange, *bars[i], *metrics[i])
+        for i in range(start, len(bars))
+    ]
+    written = copy_merge(
+        conn,
+        f"gold.features_{tf}",
+        ("symbol", "exchange", *BAR_COLUMNS, *FEATURE_COLUMNS),
+        rows,
+        FEATURE_KEY,
+        update=True,
+    )
+
+    # advance in the same transaction as the upsert
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO gold.feature_watermark (
+                symbol,
+                exchange,
+                timeframe,
+                last_timestamp
+            )
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (symbol, exchange, timeframe) DO UPDATE
+            SET last_timestamp = EXCLUDED.last_timestamp,
+                updated_at = now()
+        """, (symbol, exchange, tf, target_ts))
+
+    conn.commit()
+    return written
+
+# =========================================================
+# RUN
+# =========================================================
+
+def build_timeframe(conn, tf):
+    total = 0
+    for symbol, exchange, target_ts, from_key in get_pending(conn, tf):
+        total += build_features(conn, tf, symbol, exchange, target_ts, from_key)
+    print(f"[features_{tf}] upserted {total} bars")
+    return total
+
+
+def run():
+    conn = get_conn()
+
+    for tf in TIMEFRAMES:
+        build_timeframe(conn, tf)
+
+    conn.close()
+
+if __name__ == '__main__':
+    run()
@@ -1,5 +1,7 @@
 import psycopg2
 import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from psycopg2.pool import ThreadedConnectionPool
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -17,218 +19,227 @@ DB_PARAMS = {
     "port": os.getenv("DB_PORT"),
 }
 
+ROLLUP_WORKERS = int(os.getenv("ROLLUP_WORKERS", 4))
+
 def get_conn():
     return psycopg2.connect(**DB_PARAMS)
 
 # =========================================================
-# 1H
+# TIMEFRAMES
 # =========================================================
+#
+# Rollups cascade: 1h is built from 1m candles, 4h/1d from 1h, 1w/1mth
+# from 1d. `key` is the silver.dim_time column holding each minute's
+# bucket start (epoch ms); every bucket boundary is also a boundary of
+# its source, so building from the source rollup is exact. Each rollup is
+# a table keyed on (symbol, exchange, tf_time), upserted in place, and the
+# dict order is the build order.
 
-def build_1h_ohlc(conn):
-    with conn.cursor() as cur:
-        cur.execute("""
-        DROP MATERIALIZED VIEW IF EXISTS silver.mv_ohlc_1h;
-        
-        CREATE MATERIALIZED VIEW silver.mv_ohlc_1h AS
-        SELECT DISTINCT
-            symbol,
-            exchange,
-            tf_time,
-            FIRST_VALUE(open)  OVER w AS open,
-            MAX(high)          OVER w AS high,
-            MIN(low)           OVER w AS low,
-            LAST_VALUE(close)  OVER w AS close,
-            SUM(volume)        OVER w AS volume
-        FROM (
-            SELECT
-                symbol,
-                exchange,
-                date_trunc('hour', utc_timestamp) AS tf_time,
-                open,
-                high,
-                low,
-                close,
-                volume,
-                utc_timestamp
-            FROM silver.v_candles
-        ) t
-        WINDOW w AS (
-            PARTITION BY symbol, exchange, tf_time
-            ORDER BY utc_timestamp
-            ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
-        );
-        """)
-    conn.commit()
-# =========================================================
-# 4H
-# =========================================================
+# "UTC+8" buckets days, weeks and months on the README's reporting day
+ROLLUP_TIMEZONE = os.getenv("ROLLUP_TIMEZONE", "UTC")
+DAY_SUFFIX = {"UTC": "", "UTC+8": "_utc8"}[ROLLUP_TIMEZONE]
 
-def build_4h_ohlc(conn):
-    with conn.cursor() as cur:
-        cur.execute("""
-        DROP MATERIALIZED VIEW IF EXISTS silver.mv_ohlc_4h;
-        
-        CREATE MATERIALIZED VIEW silver.mv_ohlc_4h AS
-        SELECT DISTINCT
-            symbol,
-            exchange,
-            tf_time,
-            FIRST_VALUE(open)  OVER w AS open,
-            MAX(high)          OVER w AS high,
-            MIN(low)           OVER w AS low,
-            LAST_VALUE(close)  OVER w AS close,
-            SUM(volume)        OVER w AS volume
-        FROM (
-            SELECT
-                symbol,
-                exchange,
-                date_trunc('hour', utc_timestamp)
-                  - (EXTRACT(hour FROM utc_timestamp) % 4) * INTERVAL '1 hour'
-                  AS tf_time,
-                open,
-                high,
-                low,
-                close,
-                volume,
-                utc_timestamp
-            FROM silver.v_candles
-        ) 
-        WINDOW w AS (
-            PARTITION BY symbol, exchange, tf_time
-            ORDER BY utc_timestamp
-            ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
-        );
-        """)
-    conn.commit()
-# =========================================================
-# 1D
-# =========================================================
+TIMEFRAMES = {
+    "1h": {"source": None, "key": "bucket_1h"},
+    "4h": {"source": "1h", "key": "bucket_4h"},
+    "1d": {"source": "1h", "key": "bucket_1d" + DAY_SUFFIX},
+    "1w": {"source": "1d", "key": "bucket_1w" + DAY_SUFFIX},
+    "1mth": {"source": "1d", "key": "bucket_1mth" + DAY_SUFFIX},
+}
+
+
+def source_sql(tf):
+    # watermark, rows and integer time columns a timeframe is rolled up from
+    src = TIMEFRAMES[tf]["source"]
+    key = TIMEFRAMES[tf]["key"]
+
+    if src is None:
+        return {
+            # v_candles inner-joins dim_time, so minutes promoted past its
+            # end are not rolled up yet: advancing beyond them would leave
+            # them out of their bucket for good
+            "watermark": """
+                SELECT
+                    symbol,
+                    exchange,
+                    LEAST(
+                        last_timestamp,
+                        (SELECT COALESCE(MAX(epoch), 0) FROM silver.dim_time)
+                    ) AS last_timestamp
+                FROM silver.promote_watermark
+                WHERE interval = '1m'
+            """,
+            "rows": "silver.v_candles c",
+            "time": "c.timestamp",
+            "key": f"c.{key}",
+            # constant lower bound so fact_candles prunes to the hot months
+            "floor": "c.timestamp >= %(floor_ms)s",
+        }
+
+    return {
+        "watermark": f"""
+            SELECT symbol, exchange, last_timestamp
+            FROM silver.rollup_watermark
+            WHERE timeframe = '{src}'
+        """,
+        "rows": f"""
+            silver.ohlc_{src} c
+            JOIN silver.dim_time t
+              ON t.epoch = c.tf_epoch
+        """,
+        "time": "c.tf_epoch",
+        "key": f"t.{key}",
+        "floor": "TRUE",
+    }
 
-def build_1d_ohlc(conn):
-    with conn.cursor() as cur:
-        cur.execute("""
-        DROP MATERIALIZED VIEW IF EXISTS silver.mv_ohlc_1d;
-        
-        CREATE MATERIALIZED VIEW silver.mv_ohlc_1d AS
-        SELECT DISTINCT
-            symbol,
-            exchange,
-            tf_time,
-            FIRST_VALUE(open)  OVER w AS open,
-            MAX(high)          OVER w AS high,
-            MIN(low)           OVER w AS low,
-            LAST_VALUE(close)  OVER w AS close,
-            SUM(volume)        OVER w AS volume
-        FROM (
-            SELECT
-                symbol,
-                exchange,
-                date_trunc('day', utc_timestamp) AS tf_time,
-                open,
-                high,
-                low,
-                close,
-                volume,
-                utc_timestamp
-            FROM silver.v_candles
-        ) 
-        WINDOW w AS (
-            PARTITION BY symbol, exchange, tf_time
-            ORDER BY utc_timestamp
-            ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
-        );
-        """)
-    conn.commit()
 # =========================================================
-# 1W
+# INCREMENTAL BUILD
 # =========================================================
 
-def build_1w_ohlc(conn):
+def build_ohlc(conn, tf, instrument=None):
+    """Recompute only the buckets touched since each instrument's watermark.
+
+    Rebuilding starts at the bucket holding the watermark's minute, so
+    the still-open bucket is always refreshed. A timeframe only advances
+    as far as its source has, so build sources first. `instrument`, a
+    (symbol, exchange) pair, limits the build to it. Returns the number
+    of upserted buckets.
+    """
+    symbol, exchange = instrument or (None, None)
+    key = TIMEFRAMES[tf]["key"]
+    src = source_sql(tf)
+
     with conn.cursor() as cur:
-        cur.execute("""
-        DROP MATERIALIZED VIEW IF EXISTS silver.mv_ohlc_1w;
-        
-        CREATE MATERIALIZED VIEW silver.mv_ohlc_1w AS
-        SELECT DISTINCT
+        cur.execute(f"""
+        CREATE TEMP TABLE rollup_pending ON COMMIT DROP AS
+        SELECT
+            s.symbol,
+            s.exchange,
+            s.last_timestamp AS target_ts,
+            COALESCE(t.{key}, 0) AS from_key
+        FROM ({src["watermark"]}) s
+        LEFT JOIN silver.rollup_watermark r
+          ON r.symbol = s.symbol
+         AND r.exchange = s.exchange
+         AND r.timeframe = %(tf)s
+        LEFT JOIN silver.dim_time t
+          ON t.epoch = r.last_timestamp
+        WHERE s.last_timestamp > COALESCE(r.last_timestamp, 0)
+          AND (%(symbol)s::text IS NULL OR s.symbol = %(symbol)s)
+          AND (%(exchange)s::text IS NULL OR s.exchange = %(exchange)s);
+
+        SELECT MIN(from_key)
+        FROM rollup_pending;
+        """, {"tf": tf, "symbol": symbol, "exchange": exchange})
+        floor_ms = cur.fetchone()[0]
+
+        if floor_ms is None:
+            conn.commit()
+            return 0
+
+        cur.execute(f"""
+        INSERT INTO silver.ohlc_{tf} (
             symbol,
             exchange,
             tf_time,
-            FIRST_VALUE(open)  OVER w AS open,
-            MAX(high)          OVER w AS high,
-            MIN(low)           OVER w AS low,
-            LAST_VALUE(close)  OVER w AS close,
-            SUM(volume)        OVER w AS volume
-        FROM (
-            SELECT
-                symbol,
-                exchange,
-                date_trunc('week', utc_timestamp) AS tf_time,
-                open,
-                high,
-                low,
-                close,
-                volume,
-                utc_timestamp
-            FROM silver.v_candles
-        ) 
-        WINDOW w AS (
-            PARTITION BY symbol, exchange, tf_time
-            ORDER BY utc_timestamp
-            ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
-        );
-        """)
-    conn.commit()
-
-# =========================================================
-# 1D
-# =========================================================
+            tf_epoch,
+            open,
+            high,
+            low,
+            close,
+            volume
+        )
+        SELECT
+            c.symbol,
+            c.exchange,
+            to_timestamp({src["key"]} / 1000.0)       AS tf_time,
+            {src["key"]}                              AS tf_epoch,
+            silver.first(c.open ORDER BY {src["time"]}) AS open,
+            MAX(c.high)                               AS high,
+            MIN(c.low)                                AS low,
+            silver.last(c.close ORDER BY {src["time"]}) AS close,
+            SUM(c.volume)                             AS volume
+        FROM {src["rows"]}
+        JOIN rollup_pending p
+          ON p.symbol = c.symbol
+         AND p.exchange = c.exchange
+        WHERE {src["time"]} >= p.from_key
+          AND {src["floor"]}
+        GROUP BY c.symbol, c.exchange, {src["key"]}
+        ON CONFLICT (symbol, exchange, tf_time) DO UPDATE
+        SET tf_epoch = EXCLUDED.tf_epoch,
+            open     = EXCLUDED.open,
+            high     = EXCLUDED.high,
+            low      = EXCLUDED.low,
+            close    = EXCLUDED.close,
+            volume   = EXCLUDED.volume;
+        """, {"floor_ms": floor_ms})
+        upserted = cur.rowcount
 
-def build_1mth_ohlc(conn):
-    with conn.cursor() as cur:
+        # advance in the same transaction as the upsert
         cur.execute("""
-        DROP MATERIALIZED VIEW IF EXISTS silver.mv_ohlc_1mth;
-        
-        CREATE MATERIALIZED VIEW silver.mv_ohlc_1mth AS
-        SELECT DISTINCT
+        INSERT INTO silver.rollup_watermark (
             symbol,
             exchange,
-            tf_time,
-            FIRST_VALUE(open)  OVER w AS open,
-            MAX(high)          OVER w AS high,
-            MIN(low)           OVER w AS low,
-            LAST_VALUE(close)  OVER w AS close,
-            SUM(volume)        OVER w AS volume
-        FROM (
-            SELECT
-                symbol,
-                exchange,
-                date_trunc('month', utc_timestamp) AS tf_time,
-                open,
-                high,
-                low,
-                close,
-                volume,
-                utc_timestamp
-            FROM silver.v_candles
-        ) 
-        WINDOW w AS (
-            PARTITION BY symbol, exchange, tf_time
-            ORDER BY utc_timestamp
-            ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
-        );
-        """)
+            timeframe,
+            last_timestamp
+        )
+        SELECT symbol, exchange, %(tf)s, target_ts
+        FROM rollup_pending
+        ON CONFLICT (symbol, exchange, timeframe) DO UPDATE
+        SET last_timestamp = EXCLUDED.last_timestamp,
+            updated_at = now();
+        """, {"tf": tf})
+
     conn.commit()
+    return upserted
 
 # =========================================================
 # RUN
 # =========================================================
 
+def build_pooled(pool, tf):
+    conn = pool.getconn()
+    try:
+        return build_ohlc(conn, tf)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+
 def run():
-    conn = get_conn()
+    # each timeframe starts as soon as its source is built, on its own
+    # pooled connection, so wall time follows the slowest chain
+    # (1h → 1d → 1w) rather than the sum of all five builds
+    pool = ThreadedConnectionPool(1, ROLLUP_WORKERS, **DB_PARAMS)
+    executor = ThreadPoolExecutor(
+        max_workers=ROLLUP_WORKERS,
+        thread_name_prefix="rollup",
+    )
+
+    waiting = list(TIMEFRAMES)
+    running = {}
+    built = set()
+
+    try:
+        while waiting or running:
+            for tf in list(waiting):
+                src = TIMEFRAMES[tf]["source"]
+                if src is None or src in built:
+                    running[executor.submit(build_pooled, pool, tf)] = tf
+                    waiting.remove(tf)
 
-    build_1h_ohlc(conn)
-    build_4h_ohlc(conn)
-    build_1d_ohlc(conn)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                tf = running.pop(future)
+                n = future.result()
+                built.add(tf)
+                print(f"[ohlc_{tf}] upserted {n} buckets")
+    finally:
+        executor.shutdown(cancel_futures=True)
+        pool.closeall()
 
 if __name__ == '__main__':
-    run()
\ No newline at end of file
+    run()
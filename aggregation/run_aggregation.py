@@ -0,0 +1,231 @@
+import asyncio
+import argparse
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from ingestion.ingest_1m import IngestRuntime, ingest_all
+from utils.partitions import ensure_partitions, to_ms
+from utils import metrics
+from transform import candles_extractor, time_extractor
+from aggregation import composite, gold_export, gold_features, mv_ohlc, v_ohlc
+from aggregation.mv_ohlc import TIMEFRAMES
+
+# =========================================================
+# STAGES
+# =========================================================
+#
+# The pipeline as a DAG, in one process: every stage shares the ingest
+# runtime's connection pool and writer executor, and a stage starts as
+# soon as the stages it depends on are done, so promotion and dim_time,
+# and the per-timeframe chains, run side by side. Each stage returns the
+# rows it wrote; one whose dependencies all wrote nothing is skipped.
+
+def ensure_current_partitions(conn):
+    now = to_ms(datetime.now(timezone.utc))
+    created = ensure_partitions(conn, now, now)
+    conn.commit()
+    for part in created:
+        print(f"[partitions] created {part}")
+    return len(created)
+
+
+def db_stage(fn, *args):
+    # fn(conn, *args) on a pooled connection, off the event loop
+    async def run(runtime):
+        return await runtime.run_db(fn, *args)
+    return run
+
+
+def build_stages(ingest=True):
+    """Stage name → {"deps", "run"}, in dependency order.
+
+    "always" marks a stage that runs even when its dependencies wrote
+    nothing. Without ingest (e.g. next to stream_1m.py), promotion and
+    dim_time have no dependencies and run every cycle.
+    """
+    stages = {
+        "partitions": {"deps": (), "run": db_stage(ensure_current_partitions)},
+    }
+    if ingest:
+        stages["ingest"] = {"deps": ("partitions",), "always": True, "run": ingest_all}
+
+    bronze = ("ingest",) if ingest else ()
+    stages["fact_candles"] = {
+        "deps": bronze,
+        "run": db_stage(candles_extractor.promote_pending),
+    }
+    stages["dim_time"] = {
+        "deps": bronze,
+        "run": db_stage(time_extractor.extend_dim_time),
+    }
+
+    for tf, spec in TIMEFRAMES.items():
+        src = spec["source"]
+        stages[f"ohlc_{tf}"] = {
+            "deps": ("fact_candles", "dim_time") if src is None else (f"ohlc_{src}",),
+            "run": db_stage(mv_ohlc.build_ohlc, tf),
+        }
+        stages[f"features_{tf}"] = {
+            "deps": (f"ohlc_{tf}",),
+            "run": db_stage(gold_features.build_timeframe, tf),
+        }
+        stages[f"composite_{tf}"] = {
+            "deps": (f"ohlc_{tf}",),
+            "run": db_stage(composite.build_timeframe, tf),
+        }
+        stages[f"export_{tf}"] = {
+            "deps": (f"features_{tf}",),
+            "run": db_stage(gold_export.export_timeframe, tf),
+        }
+
+    return stages
+
+# =========================================================
+# RUN
+# =========================================================
+
+async def run_cycle(runtime, stages, force=False):
+    """Run every stage once. With `force`, nothing is skipped, so work
+    left pending by an interrupted run or a gap repair is picked up.
+    Returns rows written per stage, None for skipped ones.
+    """
+    tasks = {}
+
+    async def run_stage(name):
+        spec = stages[name]
+        written = [await tasks[d] for d in spec["deps"]]
+
+        if spec["deps"] and not (force or spec.get("always") or any(written)):
+            return None
+
+        t0 = time.perf_counter()
+        rows = await spec["run"](runtime) or 0
+        elapsed = time.perf_counter() - t0
+
+        metrics.record_stage(name, rows, elapsed)
+        print(f"[pipeline] {name}: {rows} rows in {elapsed:.2f}s")
+        return rows
+
+    # dependencies come first in `stages`, so every awaited task exists
+    for name in stages:
+        tasks[name] = asyncio.create_task(run_stage(name))
+
+    try:
+        results = await asyncio.gather(*tasks.values())
+    finally:
+        for t in tasks.values():
+            t.cancel()
+
+    return dict(zip(tasks, results))
+
+
+def record_freshness(conn):
+    # seconds from each instrument's newest candle in each layer to now
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT
+                b.symbol,
+                b.exchange,
+                b.last_timestamp,
+                p.last_timestamp,
+                r.last_timestamp,
+                g.last_timestamp
+            FROM bronze.ingest_watermark b
+            LEFT JOIN silver.promote_watermark p
+              USING (symbol, interval, exchange)
+            LEFT JOIN silver.rollup_watermark r
+              ON r.symbol = b.symbol
+             AND r.exchange = b.exchange
+             AND r.timeframe = '1h'
+            LEFT JOIN gold.feature_watermark g
+              ON g.symbol = b.symbol
+             AND g.exchange = b.exchange
+             AND g.timeframe = '1h'
+            WHERE b.interval = '1m'
+        """)
+        rows = cur.fetchall()
+    conn.rollback()
+
+    now = time.time()
+    for symbol, exchange, *layers in rows:
+        for layer, ts in zip(("bronze", "silver", "rollup", "gold"), layers):
+            if ts is not None:
+                metrics.set_gauge(
+                    "freshness_lag_seconds",
+                    round(now - ts / 1000, 3),
+                    symbol=symbol,
+                    exchange=exchange,
+                    layer=layer,
+                )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="ingest → silver → gold pipeline")
+    parser.add_argument(
+        "--every",
+        type=float,
+        default=0,
+        help="run a cycle every N seconds; default: one cycle and exit",
+    )
+    parser.add_argument(
+        "--no-ingest",
+        action="store_true",
+        help="skip the REST ingest, e.g. when stream_1m.py fills bronze",
+    )
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    stages = build_stages(ingest=not args.no_ingest)
+    runtime = IngestRuntime()
+
+    metrics.serve()
+
+    try:
+        await runtime.run_db(v_ohlc.build_views)
+
+        force = True
+        while True:
+            t0 = time.perf_counter()
+            try:
+                results = await run_cycle(runtime, stages, force)
+            except Exception as e:
+                # a failed cycle may leave downstream work behind, so the
+                # next one runs every stage
+                if not args.every:
+                    raise
+                print(f"[pipeline] cycle failed: {e!r}")
+                metrics.inc("cycle_failures_total")
+                metrics.log("cycle_failed", error=repr(e))
+                force = True
+            else:
+                force = False
+                elapsed = time.perf_counter() - t0
+                skipped = sum(r is None for r in results.values())
+
+                metrics.observe("cycle_seconds", elapsed)
+                metrics.log("cycle", seconds=round(elapsed, 6), skipped=skipped)
+                print(f"[pipeline] cycle done in {elapsed:.2f}s, {skipped} stages skipped")
+
+            if metrics.METRICS_ENABLED:
+                await runtime.run_db(record_freshness)
+                metrics.write_textfile()
+
+            if not args.every:
+                break
+            elapsed = time.perf_counter() - t0
+            await asyncio.sleep(max(0, args.every - elapsed))
+    finally:
+        await runtime.close()
+
+if __name__ == '__main__':
+    asyncio.run(main())
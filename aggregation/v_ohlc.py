@@ -29,10 +29,17 @@ def build_1h_vohlc(conn):
         cur.execute("""
         CREATE OR REPLACE VIEW silver.v_ohlc_1h AS
         SELECT
-            *,
+            symbol,
+            exchange,
+            tf_time,
+            open,
+            high,
+            low,
+            close,
+            volume,
             (close - LAG(close) OVER w)
               / NULLIF(LAG(close) OVER w, 0) AS pct_change
-        FROM silver.mv_ohlc_1h
+        FROM silver.ohlc_1h
         WINDOW w AS (
             PARTITION BY symbol, exchange
             ORDER BY tf_time
@@ -49,10 +56,17 @@ def build_4h_vohlc(conn):
         cur.execute("""
         CREATE OR REPLACE VIEW silver.v_ohlc_4h AS
         SELECT
-            *,
+            symbol,
+            exchange,
+            tf_time,
+            open,
+            high,
+            low,
+            close,
+            volume,
             (close - LAG(close) OVER w)
               / NULLIF(LAG(close) OVER w, 0) AS pct_change
-        FROM silver.mv_ohlc_4h
+        FROM silver.ohlc_4h
         WINDOW w AS (
             PARTITION BY symbol, exchange
             ORDER BY tf_time
@@ -69,10 +83,17 @@ def build_1d_vohlc(conn):
         cur.execute("""
         CREATE OR REPLACE VIEW silver.v_ohlc_1d AS
         SELECT
-            *,
+            symbol,
+            exchange,
+            tf_time,
+            open,
+            high,
+            low,
+            close,
+            volume,
             (close - LAG(close) OVER w)
               / NULLIF(LAG(close) OVER w, 0) AS pct_change
-        FROM silver.mv_ohlc_1d
+        FROM silver.ohlc_1d
         WINDOW w AS (
             PARTITION BY symbol, exchange
             ORDER BY tf_time
@@ -89,10 +110,17 @@ def build_1w_vohlc(conn):
         cur.execute("""
         CREATE OR REPLACE VIEW silver.v_ohlc_1w AS
         SELECT
-            *,
+            symbol,
+            exchange,
+            tf_time,
+            open,
+            high,
+            low,
+            close,
+            volume,
             (close - LAG(close) OVER w)
               / NULLIF(LAG(close) OVER w, 0) AS pct_change
-        FROM silver.mv_ohlc_1w
+        FROM silver.ohlc_1w
         WINDOW w AS (
             PARTITION BY symbol, exchange
             ORDER BY tf_time
@@ -109,10 +137,17 @@ def build_1mth_vohlc(conn):
         cur.execute("""
         CREATE OR REPLACE VIEW silver.v_ohlc_1mth AS
         SELECT
-            *,
+            symbol,
+            exchange,
+            tf_time,
+            open,
+            high,
+            low,
+            close,
+            volume,
             (close - LAG(close) OVER w)
               / NULLIF(LAG(close) OVER w, 0) AS pct_change
-        FROM silver.mv_ohlc_1mth
+        FROM silver.ohlc_1mth
         WINDOW w AS (
             PARTITION BY symbol, exchange
             ORDER BY tf_time
@@ -124,14 +159,18 @@ def build_1mth_vohlc(conn):
 # RUN
 # =========================================================
 
-def run():
-    conn = get_conn()
-
+def build_views(conn):
     build_1h_vohlc(conn)
     build_4h_vohlc(conn)
     build_1d_vohlc(conn)
     build_1w_vohlc(conn)
     build_1mth_vohlc(conn)
 
+
+def run():
+    conn = get_conn()
+    build_views(conn)
+    conn.close()
+
 if __name__ == '__main__':
     run()
\ No newline at end of file
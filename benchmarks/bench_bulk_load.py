@@ -0,0 +1,141 @@
+import psycopg2
+import os
+import sys
+import time
+import random
+from pathlib import Path
+from dotenv import load_dotenv
+from psycopg2.extras import execute_batch
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+load_dotenv(BASE_DIR / "config" / "setting.env")
+
+from utils.bulk_loader import copy_merge
+
+DB_PARAMS = {
+    "dbname": os.getenv("DB_NAME"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host": os.getenv("DB_HOST"),
+    "port": os.getenv("DB_PORT"),
+}
+
+def get_conn():
+    return psycopg2.connect(**DB_PARAMS)
+
+# =========================================================
+# SETUP
+# =========================================================
+BENCH_TABLE = "bench_raw_ohlc"
+
+COLUMNS = (
+    "timestamp",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "instrument_id",
+)
+KEY = ("instrument_id", "timestamp")
+
+INSERT_SQL = f"""
+    INSERT INTO {BENCH_TABLE} ({", ".join(COLUMNS)})
+    VALUES (%s,%s,%s,%s,%s,%s,%s)
+    ON CONFLICT ({", ".join(KEY)}) DO NOTHING
+"""
+
+
+def make_rows(n):
+    ts0 = 1_700_000_000_000
+    rows = []
+    price = 40_000.0
+
+    for i in range(n):
+        o = price
+        c = o + random.uniform(-25, 25)
+        rows.append((
+            ts0 + i * 60_000,
+            o,
+            max(o, c) + random.uniform(0, 10),
+            min(o, c) - random.uniform(0, 10),
+            c,
+            random.uniform(0, 50),
+            1,
+        ))
+        price = c
+
+    return rows
+
+
+def reset_table(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE TEMP TABLE IF NOT EXISTS {BENCH_TABLE}
+            (LIKE bronze.raw_ohlc INCLUDING ALL)
+        """)
+        cur.execute(f"TRUNCATE {BENCH_TABLE}")
+    conn.commit()
+
+# =========================================================
+# LOADERS
+# =========================================================
+
+def load_executemany(conn, rows):
+    with conn.cursor() as cur:
+        cur.executemany(INSERT_SQL, rows)
+    conn.commit()
+
+
+def load_execute_batch(conn, rows):
+    with conn.cursor() as cur:
+        execute_batch(cur, INSERT_SQL, rows, page_size=1000)
+    conn.commit()
+
+
+def load_copy(conn, rows):
+    copy_merge(conn, BENCH_TABLE, COLUMNS, rows, KEY)
+    conn.commit()
+
+
+LOADERS = {
+    "executemany": load_executemany,
+    "execute_batch": load_execute_batch,
+    "copy_merge": load_copy,
+}
+
+# =========================================================
+# RUN
+# =========================================================
+
+def run(sizes=(1_000, 10_000, 100_000)):
+    conn = get_conn()
+
+    for n in sizes:
+        rows = make_rows(n)
+
+        for name, loader in LOADERS.items():
+            # executemany is one round trip per row; skip the big sizes
+            if name == "executemany" and n > 10_000:
+                continue
+
+            reset_table(conn)
+            t0 = time.perf_counter()
+            loader(conn, rows)
+            elapsed = time.perf_counter() - t0
+
+            print(
+                f"[bulk_load] {name:<14} n={n:<8} "
+                f"{elapsed:8.3f}s  {n / elapsed:12,.0f} rows/s"
+            )
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    sizes = tuple(int(a) for a in sys.argv[1:]) or (1_000, 10_000, 100_000)
+    run(sizes)
@@ -0,0 +1,110 @@
+import sys
+import time
+import numpy as np
+from pathlib import Path
+from datetime import datetime, timezone
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from transform.time_extractor import (
+    DIM_TIME_COLUMNS,
+    INTERVAL_MS,
+    build_dim_time,
+    get_session,
+)
+
+# =========================================================
+# BASELINE
+# =========================================================
+
+def build_dim_time_rows(timestamps):
+    # the per-row builder build_dim_time replaced, kept for comparison
+    rows = []
+
+    for ts in timestamps:
+        ts_sec = ts / 1000 if ts > 10_000_000_000 else ts
+
+        utc = datetime.fromtimestamp(ts_sec, tz=timezone.utc)
+        iso = utc.isocalendar()
+        hour = utc.hour
+
+        rows.append((
+            ts,
+            utc,
+            utc.date(),
+            utc.year,
+            utc.month,
+            utc.day,
+            utc.hour,
+            utc.minute,
+            iso.week,
+            utc.weekday(),
+            utc.weekday() >= 5,
+            get_session(hour),
+            7 <= hour < 10,
+            12 <= hour < 15,
+            13 <= hour < 16,
+        ))
+
+    return rows
+
+# =========================================================
+# CHECK
+# =========================================================
+
+def check_equal(timestamps, sample=5_000):
+    # compare a random sample of rows field by field
+    idx = np.random.choice(len(timestamps), min(sample, len(timestamps)), replace=False)
+    ts = [int(timestamps[i]) for i in idx]
+
+    expected = build_dim_time_rows(ts)
+    dim = build_dim_time(ts)
+
+    for i, row in enumerate(expected):
+        got = (
+            int(dim["epoch"][i]),
+            dim["utc_timestamp"][i].astype(datetime).replace(tzinfo=timezone.utc),
+            dim["date"][i].astype(datetime),
+            *(int(dim[c][i]) for c in DIM_TIME_COLUMNS[3:10]),
+            bool(dim["is_weekend"][i]),
+            str(dim["session"][i]),
+            bool(dim["is_london_killzone"][i]),
+            bool(dim["is_ny_killzone"][i]),
+            bool(dim["is_london_ny_overlap"][i]),
+        )
+        if got != row:
+            raise AssertionError(f"mismatch at {ts[i]}: {got} != {row}")
+
+# =========================================================
+# RUN
+# =========================================================
+
+def run(sizes=(10_000, 1_000_000, 2_000_000)):
+    start = 1_577_836_800_000  # 2020-01-01 UTC
+
+    for n in sizes:
+        timestamps = np.arange(start, start + n * INTERVAL_MS, INTERVAL_MS)
+        check_equal(timestamps)
+
+        ts_list = timestamps.tolist()
+        t0 = time.perf_counter()
+        build_dim_time_rows(ts_list)
+        t_rows = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        build_dim_time(timestamps)
+        t_cols = time.perf_counter() - t0
+
+        print(
+            f"[dim_time] n={n:<9} rows {t_rows:8.3f}s  "
+            f"numpy {t_cols:8.3f}s  x{t_rows / t_cols:6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    sizes = tuple(int(a) for a in sys.argv[1:]) or (10_000, 1_000_000, 2_000_000)
+    run(sizes)
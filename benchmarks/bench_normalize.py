@@ -0,0 +1,105 @@
+import sys
+import json
+import time
+import random
+from pathlib import Path
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from ingestion.ingest_1m import (
+    normalize_binance,
+    normalize_binance_columns,
+    normalize_kucoin,
+    normalize_kucoin_columns,
+)
+
+# =========================================================
+# PAYLOADS
+# =========================================================
+
+def binance_payload(n):
+    ts0 = 1_700_000_000_000
+    return json.dumps([
+        [
+            ts0 + i * 60_000,
+            f"{random.uniform(30_000, 50_000):.2f}",
+            f"{random.uniform(30_000, 50_000):.2f}",
+            f"{random.uniform(30_000, 50_000):.2f}",
+            f"{random.uniform(30_000, 50_000):.2f}",
+            f"{random.uniform(0, 100):.8f}",
+            ts0 + i * 60_000 + 59_999,
+            f"{random.uniform(0, 1e6):.8f}",
+            random.randint(0, 5_000),
+            "0.0",
+            "0.0",
+            "0",
+        ]
+        for i in range(n)
+    ]).encode()
+
+
+def kucoin_payload(n):
+    ts0 = 1_700_000_000
+    return json.dumps({"code": "200000", "data": [
+        [
+            str(ts0 + i * 60),
+            f"{random.uniform(30_000, 50_000):.2f}",
+            f"{random.uniform(30_000, 50_000):.2f}",
+            f"{random.uniform(30_000, 50_000):.2f}",
+            f"{random.uniform(30_000, 50_000):.2f}",
+            f"{random.uniform(0, 100):.8f}",
+            f"{random.uniform(0, 1e6):.8f}",
+        ]
+        for i in range(n)
+    ]}).encode()
+
+# =========================================================
+# RUN
+# =========================================================
+
+CASES = {
+    "binance": (
+        binance_payload,
+        json.loads,
+        normalize_binance,
+        normalize_binance_columns,
+    ),
+    "kucoin": (
+        kucoin_payload,
+        lambda p: json.loads(p)["data"],
+        normalize_kucoin,
+        normalize_kucoin_columns,
+    ),
+}
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def run(sizes=(1_000, 100_000, 1_000_000)):
+    for exchange, (make_payload, decode, rows_fn, columns_fn) in CASES.items():
+        for n in sizes:
+            payload = make_payload(n)
+
+            # current path: stdlib json + per-row tuples
+            t_rows = timed(lambda: rows_fn(decode(payload), "BTCUSDT"))
+            # columnar path: raw body → typed arrays
+            t_cols = timed(lambda: columns_fn(payload, "BTCUSDT"))
+
+            print(
+                f"[normalize] {exchange:<8} n={n:<8} "
+                f"rows {t_rows:8.3f}s  columns {t_cols:8.3f}s  "
+                f"x{t_rows / t_cols:5.1f}"
+            )
+
+
+if __name__ == "__main__":
+    sizes = tuple(int(a) for a in sys.argv[1:]) or (1_000, 100_000, 1_000_000)
+    run(sizes)
@@ -0,0 +1,81 @@
+import sys
+import time
+import numpy as np
+from pathlib import Path
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from utils.ohlc_reader import (
+    OHLC_COLUMNS,
+    clear_cache,
+    get_conn,
+    get_ohlc,
+)
+
+# =========================================================
+# BASELINE
+# =========================================================
+
+def read_rows(conn, symbol, exchange, tf):
+    # what consumers did before: row tuples, then arrays per column
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT tf_time, {", ".join(OHLC_COLUMNS)}
+            FROM gold.features_{tf}
+            WHERE symbol = %s
+              AND exchange = %s
+            ORDER BY tf_time
+        """, (symbol, exchange))
+        rows = cur.fetchall()
+
+    columns = {
+        "tf_time": np.array(
+            [int(r[0].timestamp() * 1_000_000) for r in rows], dtype=np.int64
+        ).astype("datetime64[us]"),
+    }
+    for i, name in enumerate(OHLC_COLUMNS, start=1):
+        columns[name] = np.array([r[i] for r in rows], dtype=np.float64)
+    return columns
+
+# =========================================================
+# RUN
+# =========================================================
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def run(symbol="BTCUSDT", exchange="binance", tf="1h"):
+    conn = get_conn()
+
+    t_rows, rows = timed(lambda: read_rows(conn, symbol, exchange, tf))
+
+    def cold():
+        clear_cache()
+        return get_ohlc(symbol, exchange, tf, end="2100-01-01")
+
+    t_copy, cols = timed(cold)
+    t_hit, _ = timed(lambda: get_ohlc(symbol, exchange, tf, end="2100-01-01"))
+
+    n = len(cols["tf_time"])
+    assert n == len(rows["tf_time"])
+    assert np.allclose(rows["close"], cols["close"])
+
+    print(
+        f"[ohlc_reader] {tf} n={n:<8} rows {t_rows:8.4f}s  "
+        f"copy {t_copy:8.4f}s  cache {t_hit:8.6f}s"
+    )
+    conn.close()
+
+
+if __name__ == "__main__":
+    run(*sys.argv[1:])
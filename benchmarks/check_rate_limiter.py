@@ -0,0 +1,153 @@
+import asyncio
+import aiohttp
+import math
+import sys
+import time
+from aiohttp import web
+from email.utils import formatdate
+from pathlib import Path
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from ingestion.rate_limiter import RateLimiter, limited_get
+
+HOST = "127.0.0.1"
+USED_HEADER = "X-Used-Weight"
+GRACE = 0.05  # requests already in flight when a 429 goes out
+
+# =========================================================
+# MOCK EXCHANGE
+# =========================================================
+#
+# Fixed-window weight budget, the way Binance counts it: every request
+# costs `cost`, the used weight in the current clock-aligned window is
+# reported on each response, and a request over budget gets 429 with
+# Retry-After up to the next window, as delay-seconds or as an HTTP-date.
+
+class ThrottledServer:
+    def __init__(self, budget, window, cost, date_retry_after=False):
+        self.budget = budget
+        self.window = window
+        self.cost = cost
+        self.date_retry_after = date_retry_after
+        self.used = {}      # window index → weight accepted
+        self.arrivals = []  # (time, status, pause or None)
+
+    async def handle(self, request):
+        # windows aligned to the wall clock, like Binance's minutes
+        now = time.time()
+        idx = int(now // self.window)
+        used = self.used.get(idx, 0)
+
+        if used + self.cost > self.budget:
+            pause = (idx + 1) * self.window - now
+            if self.date_retry_after:
+                # whole seconds, rounded up, so the date is never early
+                retry_after = formatdate(math.ceil(now + pause), usegmt=True)
+            else:
+                retry_after = str(math.ceil(pause))
+            self.arrivals.append((now, 429, pause))
+            return web.Response(status=429, headers={"Retry-After": retry_after})
+
+        self.used[idx] = used + self.cost
+        self.arrivals.append((now, 200, None))
+        return web.json_response([], headers={USED_HEADER: str(self.used[idx])})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/klines", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, HOST, 0)
+        await site.start()
+        return f"http://{HOST}:{site._server.sockets[0].getsockname()[1]}/klines"
+
+# =========================================================
+# CHECK
+# =========================================================
+
+async def hammer(server, limiter, requests, concurrency):
+    # `concurrency` workers sharing one limiter, like the exchange fetchers
+    url = await server.start()
+    pending = iter(range(requests))
+    failures = []
+
+    async def worker(session):
+        for _ in pending:
+            try:
+                await limited_get(limiter, session, url, {})
+            except Exception as e:
+                failures.append(e)
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    finally:
+        await server.runner.cleanup()
+    return failures
+
+
+def requests_during_pauses(arrivals):
+    # requests that arrived while a 429's Retry-After was still running,
+    # past the ones already in flight when it was sent
+    pauses = [(t, t + p) for t, status, p in arrivals if status == 429]
+    return sum(
+        any(lo + GRACE < t < hi - GRACE for lo, hi in pauses)
+        for t, _, _ in arrivals
+    )
+
+
+async def check_within_budget(budget=20, window=1.0, cost=2, requests=60, concurrency=8):
+    # limiter sized to the server's budget, kept honest by the used header
+    server = ThrottledServer(budget, window, cost)
+    limiter = RateLimiter(budget, window, cost, used_header=USED_HEADER)
+    failures = await hammer(server, limiter, requests, concurrency)
+
+    throttled = sum(status == 429 for _, status, _ in server.arrivals)
+    peak = max(server.used.values())
+    print(
+        f"[check] within budget: {requests} requests, peak {peak}/{budget} "
+        f"weight per window, {throttled} throttled"
+    )
+    return not failures and not throttled and peak <= budget
+
+
+async def check_backoff(date_retry_after, budget=20, window=1.0, cost=2, requests=40, concurrency=8):
+    # limiter that believes in twice the real budget and reads no usage
+    # header: the server throttles it, and it has to wait out Retry-After
+    server = ThrottledServer(budget, window, cost, date_retry_after)
+    limiter = RateLimiter(2 * budget, window, cost)
+    failures = await hammer(server, limiter, requests, concurrency)
+
+    throttled = sum(status == 429 for _, status, _ in server.arrivals)
+    ignored = requests_during_pauses(server.arrivals)
+    form = "HTTP-date" if date_retry_after else "seconds"
+    print(
+        f"[check] Retry-After as {form}: {throttled} throttled, "
+        f"{ignored} sent during a pause, {len(failures)} failed, "
+        f"refill rate {limiter.rate:.1f}/{limiter.base_rate:.1f}"
+    )
+    return not failures and throttled > 0 and ignored == 0
+
+
+async def check():
+    results = {
+        "stays under budget": await check_within_budget(),
+        "backs off on Retry-After seconds": await check_backoff(False),
+        "backs off on Retry-After HTTP-date": await check_backoff(True),
+    }
+
+    for name, ok in results.items():
+        print(f"[check] {name:<36} {'ok' if ok else 'FAILED'}")
+
+    if not all(results.values()):
+        raise SystemExit("[check] rate limiter failed")
+    print("[check] rate limiter passed")
+
+
+if __name__ == "__main__":
+    asyncio.run(check())
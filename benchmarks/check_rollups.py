@@ -0,0 +1,238 @@
+import psycopg2
+import sys
+import numpy as np
+from pathlib import Path
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from ingestion.ingest_1m import (
+    DB_PARAMS,
+    INTERVAL_MS,
+    insert_batches,
+    prepare_partitions,
+)
+from transform import candles_extractor, time_extractor
+from aggregation import mv_ohlc
+from utils import instruments
+from aggregation.mv_ohlc import ROLLUP_TIMEZONE, TIMEFRAMES
+
+def get_conn():
+    return psycopg2.connect(**DB_PARAMS)
+
+# =========================================================
+# SYNTHETIC DATA
+# =========================================================
+#
+# A throwaway instrument, removed again at the end together with the
+# dim_time minutes only it needed. Promotion and rollups are limited to
+# it, so real instruments are left as they are; still, prefer a scratch
+# database, and do not run it while the pipeline extends dim_time.
+
+SYMBOL = "SYNTHUSDT"
+EXCHANGE = "synthetic"
+DAY_MS = 86_400_000
+
+
+def make_batch(timestamps, rng):
+    n = len(timestamps)
+    close = 40_000 + np.cumsum(rng.normal(0, 10, n))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 5, n)
+    low = np.minimum(open_, close) - rng.uniform(0, 5, n)
+    volume = rng.uniform(0, 10, n)
+
+    return {
+        "timestamp": timestamps,
+        "ohlcv": np.column_stack([open_, high, low, close, volume]),
+        "symbol": SYMBOL,
+        "interval": "1m",
+        "exchange": EXCHANGE,
+    }
+
+
+def run_stages(conn):
+    for row in candles_extractor.get_pending_instruments(conn):
+        if row[:3] == (SYMBOL, "1m", EXCHANGE):
+            candles_extractor.promote_instrument(conn, *row)
+
+    time_extractor.extend_dim_time(conn)
+    for tf in TIMEFRAMES:  # in source order
+        mv_ohlc.build_ohlc(conn, tf, (SYMBOL, EXCHANGE))
+
+
+def dim_time_bounds(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT MIN(epoch), MAX(epoch) FROM silver.dim_time")
+        return cur.fetchone()
+
+
+def trim_dim_time(conn, dim_min, dim_max):
+    # back to the range held before the check, or what real bronze rows
+    # written meanwhile need, whichever is wider
+    _, _, raw_min, raw_max = time_extractor.get_time_bounds(conn)
+    lo = min((v for v in (dim_min, raw_min) if v is not None), default=None)
+    hi = max((v for v in (dim_max, raw_max) if v is not None), default=None)
+
+    with conn.cursor() as cur:
+        if lo is None:
+            cur.execute("DELETE FROM silver.dim_time")
+        else:
+            cur.execute(
+                "DELETE FROM silver.dim_time WHERE epoch < %s OR epoch > %s",
+                (lo, hi),
+            )
+    conn.commit()
+
+
+def cleanup(conn):
+    with conn.cursor() as cur:
+        for table in ("bronze.raw_ohlc", "silver.fact_candles"):
+            cur.execute(f"""
+                DELETE FROM {table}
+                WHERE instrument_id IN (
+                    SELECT instrument_id
+                    FROM silver.dim_instrument
+                    WHERE symbol = %s
+                      AND exchange = %s
+                )
+            """, (SYMBOL, EXCHANGE))
+
+    tables = [
+        "silver.dim_instrument",
+        "bronze.ingest_watermark",
+        "silver.promote_watermark",
+        "silver.rollup_watermark",
+        *(f"silver.ohlc_{tf}" for tf in TIMEFRAMES),
+    ]
+    with conn.cursor() as cur:
+        for table in tables:
+            cur.execute(
+                f"DELETE FROM {table} WHERE symbol = %s AND exchange = %s",
+                (SYMBOL, EXCHANGE),
+            )
+    conn.commit()
+
+    # a later run in this process registers it again
+    instruments._INSTRUMENT_IDS.pop((SYMBOL, "1m", EXCHANGE), None)
+
+# =========================================================
+# CHECK
+# =========================================================
+
+# bucket expressions of the original rollups, evaluated in the session
+# timezone that compare() sets to ROLLUP_TIMEZONE
+LEGACY_BUCKETS = {
+    "1h": "date_trunc('hour', {t})",
+    "4h": "date_trunc('hour', {t}) - mod(EXTRACT(hour FROM {t})::int, 4) * INTERVAL '1 hour'",
+    "1d": "date_trunc('day', {t})",
+    "1w": "date_trunc('week', {t})",
+    "1mth": "date_trunc('month', {t})",
+}
+SESSION_TIMEZONE = {"UTC": "UTC", "UTC+8": "Etc/GMT-8"}  # POSIX sign is inverted
+
+
+def legacy_sql(tf):
+    # the SELECT DISTINCT / window definition the cascaded rollups replaced
+    bucket = LEGACY_BUCKETS[tf]
+    return f"""
+    SELECT DISTINCT
+        symbol,
+        exchange,
+        tf_time,
+        FIRST_VALUE(open)  OVER w AS open,
+        MAX(high)          OVER w AS high,
+        MIN(low)           OVER w AS low,
+        LAST_VALUE(close)  OVER w AS close,
+        SUM(volume)        OVER w AS volume
+    FROM (
+        SELECT
+            c.*,
+            {bucket.format(t="c.utc_timestamp")} AS tf_time
+        FROM silver.v_candles c
+        WHERE c.symbol = %(symbol)s
+          AND c.exchange = %(exchange)s
+    ) t
+    WINDOW w AS (
+        PARTITION BY symbol, exchange, tf_time
+        ORDER BY utc_timestamp
+        ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING
+    )
+    """
+
+
+def compare(conn, tf):
+    # volume is summed in a different order, so it gets a relative tolerance
+    with conn.cursor() as cur:
+        cur.execute("SET TIME ZONE %s", (SESSION_TIMEZONE[ROLLUP_TIMEZONE],))
+        cur.execute(f"""
+        WITH legacy AS ({legacy_sql(tf)}),
+        rollup AS (
+            SELECT *
+            FROM silver.ohlc_{tf}
+            WHERE symbol = %(symbol)s
+              AND exchange = %(exchange)s
+        )
+        SELECT
+            count(*),
+            count(*) FILTER (WHERE l.tf_time IS NULL OR r.tf_time IS NULL),
+            count(*) FILTER (
+                WHERE l.open  <> r.open
+                   OR l.high  <> r.high
+                   OR l.low   <> r.low
+                   OR l.close <> r.close
+                   OR abs(l.volume - r.volume) > 1e-9 * greatest(1, abs(l.volume))
+            )
+        FROM legacy l
+        FULL JOIN rollup r
+          USING (symbol, exchange, tf_time)
+        """, {"symbol": SYMBOL, "exchange": EXCHANGE})
+        return cur.fetchone()
+
+# =========================================================
+# RUN
+# =========================================================
+
+def run(days=45, seed=0):
+    conn = get_conn()
+    rng = np.random.default_rng(seed)
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT (extract(epoch FROM date_trunc('day', now())) * 1000)::BIGINT")
+        end = cur.fetchone()[0]
+
+    timestamps = np.arange(end - days * DAY_MS, end, INTERVAL_MS, dtype=np.int64)
+    # split off-boundary so the second pass reopens partial buckets
+    split = int(len(timestamps) * 0.6) + 17
+
+    cleanup(conn)
+    dim_min, dim_max = dim_time_bounds(conn)
+    prepare_partitions(conn, int(timestamps[0]), int(timestamps[-1]))
+    try:
+        for part in (timestamps[:split], timestamps[split:]):
+            insert_batches(conn, [make_batch(part, rng)])
+            run_stages(conn)
+
+        failed = False
+        for tf in TIMEFRAMES:
+            buckets, missing, differing = compare(conn, tf)
+            failed |= bool(missing or differing) or not buckets
+            print(
+                f"[check] ohlc_{tf:<5} buckets={buckets:<6} "
+                f"missing={missing:<4} differing={differing}"
+            )
+    finally:
+        cleanup(conn)
+        trim_dim_time(conn, dim_min, dim_max)
+        conn.close()
+
+    if failed:
+        raise SystemExit("[check] rollups differ from the legacy definitions")
+    print("[check] rollups match the legacy definitions")
+
+
+if __name__ == "__main__":
+    run(*(int(a) for a in sys.argv[1:]))
@@ -6,9 +6,72 @@ CREATE TABLE IF NOT EXISTS bronze.raw_ohlc (
     close       DOUBLE PRECISION NOT NULL,
     volume      DOUBLE PRECISION NOT NULL,
 
-    symbol      TEXT        NOT NULL,
-    interval    TEXT        NOT NULL,   -- "1m", "5m", etc
-    exchange    TEXT        NOT NULL,   -- binance, bybit, etc
+    instrument_id INT       NOT NULL,   -- silver.dim_instrument
 
-    PRIMARY KEY (timestamp, symbol, interval, exchange)
+    PRIMARY KEY (instrument_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- monthly partitions are created ahead by utils/partitions.py; BRIN keeps
+-- timestamp range scans cheap on append-only minute data
+CREATE INDEX IF NOT EXISTS raw_ohlc_timestamp_brin
+    ON bronze.raw_ohlc USING brin (timestamp);
+
+-- resume point per instrument, advanced in the same transaction as inserts
+CREATE TABLE IF NOT EXISTS bronze.ingest_watermark (
+    symbol          TEXT        NOT NULL,
+    interval        TEXT        NOT NULL,
+    exchange        TEXT        NOT NULL,
+    last_timestamp  BIGINT      NOT NULL,  -- epoch ms of newest candle held
+    rewind_from     BIGINT,                -- epoch ms of oldest candle written
+                                           -- below last_timestamp since the
+                                           -- last promotion
+    rewind_seq      BIGINT      NOT NULL DEFAULT 0,  -- bumped by every such write
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    PRIMARY KEY (symbol, interval, exchange)
+);
+
+-- backfills and out-of-order gap fills land behind last_timestamp;
+-- transform/candles_extractor.py promotes from here and clears it once every row up to the rewind_seq it read is promoted, unless a writer
+-- has bumped rewind_seq meanwhile
+ALTER TABLE bronze.ingest_watermark ADD COLUMN IF NOT EXISTS rewind_from BIGINT;
+ALTER TABLE bronze.ingest_watermark
+    ADD COLUMN IF NOT EXISTS rewind_seq BIGINT NOT NULL DEFAULT 0;
+
+-- one-off seed for instruments ingested before the watermark table existed
+INSERT INTO bronze.ingest_watermark (symbol, interval, exchange, last_timestamp)
+SELECT i.symbol, i.interval, i.exchange, MAX(f.timestamp)
+FROM bronze.raw_ohlc f
+JOIN silver.dim_instrument i USING (instrument_id)
+GROUP BY i.symbol, i.interval, i.exchange
+ON CONFLICT (symbol, interval, exchange) DO NOTHING;
+
+-- missing 1m ranges inside bronze, found by ingestion/gaps.py; a gap the
+-- exchange cannot fill either stays open and stops being retried after
+-- GAP_MAX_ATTEMPTS repairs
+CREATE TABLE IF NOT EXISTS bronze.ingest_gaps (
+    instrument_id   INT         NOT NULL,   -- silver.dim_instrument
+    gap_start       BIGINT      NOT NULL,   -- epoch ms of first missing candle
+    gap_end         BIGINT      NOT NULL,   -- epoch ms of last missing candle
+    missing         INT         NOT NULL,   -- candles missing when found
+    attempts        INT         NOT NULL DEFAULT 0,
+    detected_at     TIMESTAMPTZ NOT NULL DEFAULT now(),
+    filled_at       TIMESTAMPTZ,
+
+    PRIMARY KEY (instrument_id, gap_start)
+);
+
+CREATE INDEX IF NOT EXISTS ingest_gaps_open
+    ON bronze.ingest_gaps (instrument_id)
+    WHERE filled_at IS NULL;
+
+-- newest candle already scanned for gaps, per instrument
+CREATE TABLE IF NOT EXISTS bronze.gap_scan_watermark (
+    symbol          TEXT        NOT NULL,
+    interval        TEXT        NOT NULL,
+    exchange        TEXT        NOT NULL,
+    last_timestamp  BIGINT      NOT NULL,  -- epoch ms
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    PRIMARY KEY (symbol, interval, exchange)
 );
@@ -1,3 +1,93 @@
+-- bars plus derived metrics per timeframe, maintained incrementally by
+-- aggregation/gold_features.py; rolling metrics span FEATURE_WINDOW bars
+CREATE TABLE IF NOT EXISTS gold.features_1h (
+    symbol          TEXT        NOT NULL,
+    exchange        TEXT        NOT NULL,
+    tf_time         TIMESTAMPTZ NOT NULL,
+    open            DOUBLE PRECISION NOT NULL,
+    high            DOUBLE PRECISION NOT NULL,
+    low             DOUBLE PRECISION NOT NULL,
+    close           DOUBLE PRECISION NOT NULL,
+    volume          DOUBLE PRECISION NOT NULL,
+
+    pct_change      DOUBLE PRECISION,   -- close vs previous close
+    log_return      DOUBLE PRECISION,   -- ln(close / previous close)
+    volatility      DOUBLE PRECISION,   -- stddev of log_return
+    vwap            DOUBLE PRECISION,   -- volume-weighted typical price
+    atr             DOUBLE PRECISION,   -- mean true range
+    rolling_volume  DOUBLE PRECISION,   -- summed volume
+
+    PRIMARY KEY (symbol, exchange, tf_time)
+);
+
+CREATE TABLE IF NOT EXISTS gold.features_4h   (LIKE gold.features_1h INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS gold.features_1d   (LIKE gold.features_1h INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS gold.features_1w   (LIKE gold.features_1h INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS gold.features_1mth (LIKE gold.features_1h INCLUDING ALL);
+
+-- newest fact candle reflected in each feature table, per instrument
+CREATE TABLE IF NOT EXISTS gold.feature_watermark (
+    symbol          TEXT        NOT NULL,
+    exchange        TEXT        NOT NULL,
+    timeframe       TEXT        NOT NULL,   -- "1h", "4h", "1d", "1w", "1mth"
+    last_timestamp  BIGINT      NOT NULL,   -- epoch ms
+    revision        BIGINT      NOT NULL DEFAULT 0,  -- bumped on each rewind
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    PRIMARY KEY (symbol, exchange, timeframe)
+);
+
+-- a rewind rebuilds bars readers may hold as closed (utils/ohlc_reader.py)
+ALTER TABLE gold.feature_watermark
+    ADD COLUMN IF NOT EXISTS revision BIGINT NOT NULL DEFAULT 0;
+
+-- newest closed bar written to the Parquet export, per instrument;
+-- maintained by aggregation/gold_export.py
+CREATE TABLE IF NOT EXISTS gold.export_watermark (
+    symbol          TEXT        NOT NULL,
+    exchange        TEXT        NOT NULL,
+    timeframe       TEXT        NOT NULL,   -- "1h", "4h", "1d", "1w", "1mth"
+    last_tf_time    BIGINT      NOT NULL,   -- epoch ms
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    PRIMARY KEY (symbol, exchange, timeframe)
+);
+
+-- one series per symbol across exchanges, maintained incrementally by
+-- aggregation/composite.py from the per-exchange rollups; prices are
+-- volume-weighted over the exchanges with a bar in the bucket
+CREATE TABLE IF NOT EXISTS gold.composite_1h (
+    symbol          TEXT        NOT NULL,
+    tf_time         TIMESTAMPTZ NOT NULL,
+    open            DOUBLE PRECISION NOT NULL,
+    high            DOUBLE PRECISION NOT NULL,
+    low             DOUBLE PRECISION NOT NULL,
+    close           DOUBLE PRECISION NOT NULL,
+    volume          DOUBLE PRECISION NOT NULL,   -- summed over exchanges
+
+    exchanges       SMALLINT    NOT NULL,   -- exchanges with a bar
+    spread          DOUBLE PRECISION NOT NULL,   -- max - min close
+    divergence      JSONB       NOT NULL,   -- exchange → close / composite close - 1
+
+    PRIMARY KEY (symbol, tf_time)
+);
+
+CREATE TABLE IF NOT EXISTS gold.composite_4h   (LIKE gold.composite_1h INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS gold.composite_1d   (LIKE gold.composite_1h INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS gold.composite_1w   (LIKE gold.composite_1h INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS gold.composite_1mth (LIKE gold.composite_1h INCLUDING ALL);
+
+-- newest fact candle of each exchange folded into the composites
+CREATE TABLE IF NOT EXISTS gold.composite_watermark (
+    symbol          TEXT        NOT NULL,
+    exchange        TEXT        NOT NULL,
+    timeframe       TEXT        NOT NULL,   -- "1h", "4h", "1d", "1w", "1mth"
+    last_timestamp  BIGINT      NOT NULL,   -- epoch ms
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    PRIMARY KEY (symbol, exchange, timeframe)
+);
+
 CREATE OR REPLACE VIEW gold.v_ohlc_1h AS
 SELECT
     symbol,
@@ -9,7 +99,7 @@ SELECT
     close,
     volume,
     pct_change
-FROM silver.v_ohlc_1h;
+FROM gold.features_1h;
 
 CREATE OR REPLACE VIEW gold.v_ohlc_4h AS
 SELECT
@@ -22,7 +112,7 @@ SELECT
     close,
     volume,
     pct_change
-FROM silver.v_ohlc_4h;
+FROM gold.features_4h;
 
 CREATE OR REPLACE VIEW gold.v_ohlc_1d AS
 SELECT
@@ -35,7 +125,7 @@ SELECT
     close,
     volume,
     pct_change
-FROM silver.v_ohlc_1d;
+FROM gold.features_1d;
 
 CREATE OR REPLACE VIEW gold.v_ohlc_1w AS
 SELECT
@@ -48,7 +138,7 @@ SELECT
     close,
     volume,
     pct_change
-FROM silver.v_ohlc_1w;
+FROM gold.features_1w;
 
 CREATE OR REPLACE VIEW gold.v_ohlc_1mth AS
 SELECT
@@ -61,4 +151,4 @@ SELECT
     close,
     volume,
     pct_change
-FROM silver.v_ohlc_1mth;
+FROM gold.features_1mth;
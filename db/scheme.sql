@@ -2,4 +2,13 @@ CREATE SCHEMA IF NOT EXISTS bronze;
 CREATE SCHEMA IF NOT EXISTS silver;
 CREATE SCHEMA IF NOT EXISTS gold;
 
+-- shared by bronze and silver: fact rows carry the 4-byte id, not the TEXT
+-- triple; ids are issued by the ingestion writers (utils/instruments.py)
+CREATE TABLE IF NOT EXISTS silver.dim_instrument (
+    instrument_id   INT         GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    symbol          TEXT        NOT NULL,
+    interval        TEXT        NOT NULL,   -- "1m", "5m", etc
+    exchange        TEXT        NOT NULL,   -- binance, bybit, etc
 
+    UNIQUE (symbol, interval, exchange)
+);
@@ -6,43 +6,178 @@ CREATE TABLE IF NOT EXISTS silver.fact_candles (
     close       DOUBLE PRECISION NOT NULL,
     volume      DOUBLE PRECISION NOT NULL,
 
-    symbol      TEXT        NOT NULL,
-    interval    TEXT        NOT NULL,   -- "1m", "5m", etc
-    exchange    TEXT        NOT NULL,   -- binance, bybit, etc
+    instrument_id INT       NOT NULL,   -- silver.dim_instrument
+
+    PRIMARY KEY (instrument_id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+-- monthly partitions are created ahead by utils/partitions.py; BRIN keeps
+-- timestamp range scans cheap on append-only minute data
+CREATE INDEX IF NOT EXISTS fact_candles_timestamp_brin
+    ON silver.fact_candles USING brin (timestamp);
+
+-- bronze → silver promotion progress per instrument
+CREATE TABLE IF NOT EXISTS silver.promote_watermark (
+    symbol          TEXT        NOT NULL,
+    interval        TEXT        NOT NULL,
+    exchange        TEXT        NOT NULL,
+    last_timestamp  BIGINT      NOT NULL,  -- epoch ms of newest promoted candle
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
 
-    PRIMARY KEY (timestamp, symbol, interval, exchange)
+    PRIMARY KEY (symbol, interval, exchange)
 );
 
+-- one-off seed for instruments promoted before the watermark table existed
+INSERT INTO silver.promote_watermark (symbol, interval, exchange, last_timestamp)
+SELECT i.symbol, i.interval, i.exchange, MAX(f.timestamp)
+FROM silver.fact_candles f
+JOIN silver.dim_instrument i USING (instrument_id)
+GROUP BY i.symbol, i.interval, i.exchange
+ON CONFLICT (symbol, interval, exchange) DO NOTHING;
+
 CREATE TABLE IF NOT EXISTS silver.dim_time(
-	epoch,
-	utc_timestamp,
-	date,
-	year, 
-	month,
-	day,
-	hour,
-	minute,
-	iso_week,
-	weekday,
-	is_weekend,
-	session
+	epoch          BIGINT      PRIMARY KEY,  -- epoch ms, one row per minute
+	utc_timestamp  TIMESTAMPTZ NOT NULL,
+	date           DATE        NOT NULL,
+	year           SMALLINT    NOT NULL,
+	month          SMALLINT    NOT NULL,
+	day            SMALLINT    NOT NULL,
+	hour           SMALLINT    NOT NULL,
+	minute         SMALLINT    NOT NULL,
+	iso_week       SMALLINT    NOT NULL,
+	weekday        SMALLINT    NOT NULL,
+	is_weekend     BOOLEAN     NOT NULL,
+	session        TEXT        NOT NULL
 );
 
 ALTER TABLE silver.dim_time
-ADD COLUMN is_london_killzone BOOLEAN NOT NULL DEFAULT FALSE,
-ADD COLUMN is_ny_killzone     BOOLEAN NOT NULL DEFAULT FALSE;
+ADD COLUMN IF NOT EXISTS is_london_killzone BOOLEAN NOT NULL DEFAULT FALSE,
+ADD COLUMN IF NOT EXISTS is_ny_killzone     BOOLEAN NOT NULL DEFAULT FALSE;
 
 ALTER TABLE silver.dim_time
 ADD COLUMN IF NOT EXISTS is_london_ny_overlap BOOLEAN NOT NULL DEFAULT FALSE;
 
+-- bucket start per timeframe as epoch ms, so rollups group on integers;
+-- *_utc8 follow the UTC+8 reporting day (1h/4h boundaries are the same)
+ALTER TABLE silver.dim_time
+ADD COLUMN IF NOT EXISTS bucket_1h        BIGINT,
+ADD COLUMN IF NOT EXISTS bucket_4h        BIGINT,
+ADD COLUMN IF NOT EXISTS bucket_1d        BIGINT,
+ADD COLUMN IF NOT EXISTS bucket_1w        BIGINT,
+ADD COLUMN IF NOT EXISTS bucket_1mth      BIGINT,
+ADD COLUMN IF NOT EXISTS bucket_1d_utc8   BIGINT,
+ADD COLUMN IF NOT EXISTS bucket_1w_utc8   BIGINT,
+ADD COLUMN IF NOT EXISTS bucket_1mth_utc8 BIGINT;
+
+-- one-off fill for minutes built before the bucket columns existed
+-- ('Etc/GMT-8' is UTC+8: POSIX zone names invert the sign)
+UPDATE silver.dim_time
+SET bucket_1h        = epoch - epoch % 3600000,
+    bucket_4h        = epoch - epoch % 14400000,
+    bucket_1d        = epoch - epoch % 86400000,
+    bucket_1w        = (EXTRACT(epoch FROM date_trunc('week',  utc_timestamp, 'UTC')) * 1000)::BIGINT,
+    bucket_1mth      = (EXTRACT(epoch FROM date_trunc('month', utc_timestamp, 'UTC')) * 1000)::BIGINT,
+    bucket_1d_utc8   = (EXTRACT(epoch FROM date_trunc('day',   utc_timestamp, 'Etc/GMT-8')) * 1000)::BIGINT,
+    bucket_1w_utc8   = (EXTRACT(epoch FROM date_trunc('week',  utc_timestamp, 'Etc/GMT-8')) * 1000)::BIGINT,
+    bucket_1mth_utc8 = (EXTRACT(epoch FROM date_trunc('month', utc_timestamp, 'Etc/GMT-8')) * 1000)::BIGINT
+WHERE bucket_1h IS NULL;
+
 CREATE OR REPLACE VIEW silver.v_candles AS
 SELECT
-  f.*,
+  f.timestamp,
+  f.open,
+  f.high,
+  f.low,
+  f.close,
+  f.volume,
+  i.symbol,
+  i.interval,
+  i.exchange,
   t.utc_timestamp,
   t.session,
   t.is_london_killzone,
   t.is_ny_killzone,
-  t.is_london_ny_overlap
+  t.is_london_ny_overlap,
+  t.bucket_1h,
+  t.bucket_4h,
+  t.bucket_1d,
+  t.bucket_1w,
+  t.bucket_1mth,
+  t.bucket_1d_utc8,
+  t.bucket_1w_utc8,
+  t.bucket_1mth_utc8
 FROM silver.fact_candles f
+JOIN silver.dim_instrument i
+  ON i.instrument_id = f.instrument_id
 JOIN silver.dim_time t
   ON f.timestamp = t.epoch;
+
+-- incremental OHLC rollups, maintained by aggregation/mv_ohlc.py
+-- (replace the legacy silver.mv_ohlc_* materialized views)
+CREATE TABLE IF NOT EXISTS silver.ohlc_1h (
+    symbol      TEXT        NOT NULL,
+    exchange    TEXT        NOT NULL,
+    tf_time     TIMESTAMPTZ NOT NULL,
+    open        DOUBLE PRECISION NOT NULL,
+    high        DOUBLE PRECISION NOT NULL,
+    low         DOUBLE PRECISION NOT NULL,
+    close       DOUBLE PRECISION NOT NULL,
+    volume      DOUBLE PRECISION NOT NULL,
+
+    PRIMARY KEY (symbol, exchange, tf_time)
+);
+
+CREATE TABLE IF NOT EXISTS silver.ohlc_4h   (LIKE silver.ohlc_1h INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS silver.ohlc_1d   (LIKE silver.ohlc_1h INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS silver.ohlc_1w   (LIKE silver.ohlc_1h INCLUDING ALL);
+CREATE TABLE IF NOT EXISTS silver.ohlc_1mth (LIKE silver.ohlc_1h INCLUDING ALL);
+
+-- tf_time as epoch ms: the integer key the next timeframe up groups on
+ALTER TABLE silver.ohlc_1h   ADD COLUMN IF NOT EXISTS tf_epoch BIGINT;
+ALTER TABLE silver.ohlc_4h   ADD COLUMN IF NOT EXISTS tf_epoch BIGINT;
+ALTER TABLE silver.ohlc_1d   ADD COLUMN IF NOT EXISTS tf_epoch BIGINT;
+ALTER TABLE silver.ohlc_1w   ADD COLUMN IF NOT EXISTS tf_epoch BIGINT;
+ALTER TABLE silver.ohlc_1mth ADD COLUMN IF NOT EXISTS tf_epoch BIGINT;
+
+-- one-off fill for buckets rolled up before tf_epoch existed
+UPDATE silver.ohlc_1h   SET tf_epoch = (EXTRACT(epoch FROM tf_time) * 1000)::BIGINT WHERE tf_epoch IS NULL;
+UPDATE silver.ohlc_4h   SET tf_epoch = (EXTRACT(epoch FROM tf_time) * 1000)::BIGINT WHERE tf_epoch IS NULL;
+UPDATE silver.ohlc_1d   SET tf_epoch = (EXTRACT(epoch FROM tf_time) * 1000)::BIGINT WHERE tf_epoch IS NULL;
+UPDATE silver.ohlc_1w   SET tf_epoch = (EXTRACT(epoch FROM tf_time) * 1000)::BIGINT WHERE tf_epoch IS NULL;
+UPDATE silver.ohlc_1mth SET tf_epoch = (EXTRACT(epoch FROM tf_time) * 1000)::BIGINT WHERE tf_epoch IS NULL;
+
+-- 1h and 1d feed the higher timeframes, which scan them by tf_epoch
+CREATE INDEX IF NOT EXISTS ohlc_1h_tf_epoch_idx ON silver.ohlc_1h (symbol, exchange, tf_epoch);
+CREATE INDEX IF NOT EXISTS ohlc_1d_tf_epoch_idx ON silver.ohlc_1d (symbol, exchange, tf_epoch);
+
+-- newest fact candle folded into each rollup, per instrument
+CREATE TABLE IF NOT EXISTS silver.rollup_watermark (
+    symbol          TEXT        NOT NULL,
+    exchange        TEXT        NOT NULL,
+    timeframe       TEXT        NOT NULL,   -- "1h", "4h", "1d", "1w", "1mth"
+    last_timestamp  BIGINT      NOT NULL,   -- epoch ms
+    updated_at      TIMESTAMPTZ NOT NULL DEFAULT now(),
+
+    PRIMARY KEY (symbol, exchange, timeframe)
+);
+
+-- grouped first/last, used by the rollups as first(x ORDER BY t)
+CREATE OR REPLACE FUNCTION silver.first_agg(anyelement, anyelement)
+RETURNS anyelement LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+AS 'SELECT $1';
+
+CREATE OR REPLACE FUNCTION silver.last_agg(anyelement, anyelement)
+RETURNS anyelement LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+AS 'SELECT $2';
+
+CREATE OR REPLACE AGGREGATE silver.first(anyelement) (
+    SFUNC = silver.first_agg,
+    STYPE = anyelement,
+    PARALLEL = SAFE
+);
+
+CREATE OR REPLACE AGGREGATE silver.last(anyelement) (
+    SFUNC = silver.last_agg,
+    STYPE = anyelement,
+    PARALLEL = SAFE
+);
@@ -0,0 +1,226 @@
+import asyncio
+import argparse
+import os
+import sys
+from functools import partial
+from pathlib import Path
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+
+from ingestion.ingest_1m import (
+    EXCHANGES,
+    INTERVAL_MS,
+    IngestRuntime,
+    fetch_range,
+    get_conn,
+    run_pipeline,
+)
+from utils import metrics
+
+GAP_MAX_ATTEMPTS = int(os.getenv("GAP_MAX_ATTEMPTS", 3))
+
+# =========================================================
+# SCAN
+# =========================================================
+#
+# fetch_latest() resumes from the watermark, so a hole left behind it (a failed
+# page, an exchange outage) is never revisited. The scan compares each
+# candle with the next one over the primary key, from the last scanned
+# candle up to the ingest watermark, and records every jump of more than
+# one interval as a gap.
+
+def scan_gaps(conn, full=False):
+    """Record new gaps in bronze.ingest_gaps. Returns (symbol, exchange, found)
+    per scanned instrument. `full` rescans all of bronze, which resets the
+    attempts of gaps still open.
+    """
+    with conn.cursor() as cur:
+        if full:
+            cur.execute("DELETE FROM bronze.gap_scan_watermark")
+            cur.execute("DELETE FROM bronze.ingest_gaps WHERE filled_at IS NULL")
+
+        cur.execute("""
+            WITH bounds AS (
+                SELECT
+                    i.instrument_id,
+                    w.symbol,
+                    w.exchange,
+                    w.interval,
+                    COALESCE(g.last_timestamp, 0) AS lo,
+                    w.last_timestamp AS hi
+                FROM bronze.ingest_watermark w
+                JOIN silver.dim_instrument i
+                  USING (symbol, interval, exchange)
+                LEFT JOIN bronze.gap_scan_watermark g
+                  USING (symbol, interval, exchange)
+                WHERE w.interval = '1m'
+                  AND w.last_timestamp > COALESCE(g.last_timestamp, 0)
+            ),
+            found AS (
+                INSERT INTO bronze.ingest_gaps (
+                    instrument_id,
+                    gap_start,
+                    gap_end,
+                    missing
+                )
+                SELECT
+                    b.instrument_id,
+                    s.timestamp + %(step)s,
+                    s.next_ts - %(step)s,
+                    (s.next_ts - s.timestamp) / %(step)s - 1
+                FROM bounds b
+                CROSS JOIN LATERAL (
+                    SELECT
+                        timestamp,
+                        LEAD(timestamp) OVER (ORDER BY timestamp) AS next_ts
+                    FROM bronze.raw_ohlc
+                    WHERE instrument_id = b.instrument_id
+                      AND timestamp >= b.lo
+                      AND timestamp <= b.hi
+                ) s
+                WHERE s.next_ts - s.timestamp > %(step)s
+                ON CONFLICT (instrument_id, gap_start) DO NOTHING
+                RETURNING instrument_id
+            ),
+            scanned AS (
+                INSERT INTO bronze.gap_scan_watermark (
+                    symbol,
+                    interval,
+                    exchange,
+                    last_timestamp
+                )
+                SELECT symbol, interval, exchange, hi
+                FROM bounds
+                ON CONFLICT (symbol, interval, exchange) DO UPDATE
+                SET last_timestamp = EXCLUDED.last_timestamp,
+                    updated_at = now()
+            )
+            SELECT b.symbol, b.exchange, count(f.instrument_id)
+            FROM bounds b
+            LEFT JOIN found f
+              USING (instrument_id)
+            GROUP BY b.symbol, b.exchange
+            ORDER BY b.exchange, b.symbol
+        """, {"step": INTERVAL_MS})
+        scanned = cur.fetchall()
+
+    conn.commit()
+    return scanned
+
+# =========================================================
+# REPAIR
+# =========================================================
+
+def get_open_gaps(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT
+                g.instrument_id,
+                i.symbol,
+                i.interval,
+                i.exchange,
+                g.gap_start,
+                g.gap_end,
+                g.missing
+            FROM bronze.ingest_gaps g
+            JOIN silver.dim_instrument i
+              USING (instrument_id)
+            WHERE g.filled_at IS NULL
+              AND g.attempts < %s
+            ORDER BY i.exchange, i.symbol, g.gap_start
+        """, (GAP_MAX_ATTEMPTS,))
+        return [g for g in cur.fetchall() if g[3] in EXCHANGES]
+
+
+def settle_gaps(conn, gaps):
+    # count what the refetch filled; the candles written behind the ingest
+    # watermark are carried through silver and gold by the next promotion
+    # (see bronze.ingest_watermark.rewind_from)
+    filled = 0
+
+    with conn.cursor() as cur:
+        for instrument_id, _, _, _, gap_start, gap_end, _ in gaps:
+            cur.execute("""
+                SELECT count(*)
+                FROM bronze.raw_ohlc
+                WHERE instrument_id = %s
+                  AND timestamp >= %s
+                  AND timestamp <= %s
+            """, (instrument_id, gap_start, gap_end))
+            still_missing = (gap_end - gap_start) // INTERVAL_MS + 1 - cur.fetchone()[0]
+
+            cur.execute("""
+                UPDATE bronze.ingest_gaps
+                SET missing = %s,
+                    attempts = attempts + 1,
+                    filled_at = CASE WHEN %s = 0 THEN now() END
+                WHERE instrument_id = %s
+                  AND gap_start = %s
+            """, (still_missing, still_missing, instrument_id, gap_start))
+            filled += still_missing == 0
+
+    conn.commit()
+    return filled
+
+
+async def repair(runtime):
+    """Refetch only the open gaps, through the same fetch → normalize →
+    write pipeline as a backfill."""
+    gaps = await runtime.run_db(get_open_gaps)
+    if not gaps:
+        print("[gaps] nothing to repair")
+        return
+
+    producers = [
+        partial(fetch_range, runtime, symbol, exchange, gap_start, gap_end)
+        for _, symbol, _, exchange, gap_start, gap_end, _ in gaps
+    ]
+    await run_pipeline(runtime, producers)
+
+    filled = await runtime.run_db(settle_gaps, gaps)
+    print(f"[gaps] filled {filled} of {len(gaps)} gaps")
+
+# =========================================================
+# MAIN
+# =========================================================
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="1m gap scanner and repair")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    scan = sub.add_parser("scan", help="record missing 1m ranges in bronze")
+    scan.add_argument("--full", action="store_true", help="rescan all of bronze")
+
+    sub.add_parser("repair", help="scan, then refetch the open gaps")
+    return parser.parse_args()
+
+
+def report(scanned):
+    for symbol, exchange, found in scanned:
+        print(f"[gaps] {exchange} {symbol}: {found} new gaps")
+
+
+async def main():
+    args = parse_args()
+    metrics.serve()
+
+    try:
+        conn = get_conn()
+        report(scan_gaps(conn, full=args.command == "scan" and args.full))
+        conn.close()
+
+        if args.command == "repair":
+            runtime = IngestRuntime()
+            try:
+                await repair(runtime)
+            finally:
+                await runtime.close()
+    finally:
+        metrics.write_textfile()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,20 @@
 import asyncio
 import aiohttp
 import psycopg2
+import numpy as np
 import os
+import sys
+import argparse
+import threading
+import time
+import warnings
+from functools import partial
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from psycopg2.pool import ThreadedConnectionPool
 from dotenv import load_dotenv
 from pathlib import Path
+from datetime import datetime, timezone
 import socket
 
 socket.setdefaulttimeout(15)
@@ -12,8 +23,15 @@ socket.setdefaulttimeout(15)
 # ENV
 # =========================================================
 BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
 load_dotenv(BASE_DIR / "config" / "setting.env")
 
+from utils.bulk_loader import copy_merge, copy_merge_columns
+from utils.instruments import encode_rows, get_instrument_id
+from utils.partitions import ensure_partitions
+from utils import metrics
+from ingestion.rate_limiter import RateLimiter, limited_get
+
 DB_PARAMS = {
     "dbname": os.getenv("DB_NAME"),
     "user": os.getenv("DB_USER"),
@@ -22,8 +40,25 @@ DB_PARAMS = {
     "port": os.getenv("DB_PORT"),
 }
 
-BINANCE_URL = "https://data-api.binance.vision/api/v3/klines"
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 10))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 20))
+HTTP_KEEPALIVE = int(os.getenv("HTTP_KEEPALIVE", 30))
+
+PAGE_QUEUE_SIZE = int(os.getenv("PAGE_QUEUE_SIZE", 32))
+BATCH_QUEUE_SIZE = int(os.getenv("BATCH_QUEUE_SIZE", 32))
+WRITER_MAX_ROWS = int(os.getenv("WRITER_MAX_ROWS", 50_000))
+WRITER_LINGER = float(os.getenv("WRITER_LINGER", 0.2))
+
+BINANCE_URL = os.getenv(
+    "BINANCE_URL", "https://data-api.binance.vision/api/v3/klines"
+)
 KUCOIN_URL = "https://api-futures.kucoin.com/api/v1/market/candles"
+KUCOIN_SPOT_URL = os.getenv(
+    "KUCOIN_SPOT_URL", "https://api.kucoin.com/api/v1/market/candles"
+)
+
+INTERVAL_MS = 60_000  # 1m candles
 
 # =========================================================
 # DB
@@ -32,49 +67,244 @@ def get_conn():
     return psycopg2.connect(**DB_PARAMS)
 
 
+# (symbol, interval, exchange) → last ingested epoch ms
+_WATERMARKS = {}
+_WATERMARKS_LOCK = threading.Lock()
+
+
 def get_last_timestamp(conn, symbol, interval, exchange):
+    key = (symbol, interval, exchange)
+    if key in _WATERMARKS:
+        return _WATERMARKS[key]
+
     with conn.cursor() as cur:
         cur.execute(
             """
-            SELECT MAX(timestamp)
-            FROM bronze.raw_ohlc
+            SELECT last_timestamp
+            FROM bronze.ingest_watermark
             WHERE symbol=%s AND interval=%s AND exchange=%s
             """,
-            (symbol, interval, exchange),
+            key,
         )
         row = cur.fetchone()
-        return row[0]
+
+    last_ts = row[0] if row else None
+    with _WATERMARKS_LOCK:
+        _WATERMARKS.setdefault(key, last_ts)
+        return _WATERMARKS[key]
+
+
+def bounds_by_instrument(rows):
+    # (symbol, interval, exchange) → (oldest, newest) epoch ms in rows
+    bounds = {}
+    for r in rows:
+        key = (r[6], r[7], r[8])
+        lo, hi = bounds.get(key, (r[0], r[0]))
+        bounds[key] = (min(lo, r[0]), max(hi, r[0]))
+    return bounds
+
+
+def advance_watermarks(conn, bounds):
+    """Advance last_timestamp to the newest candle written. A write that
+    reaches behind it (a --start backfill, a gap fill landing after newer
+    stream candles) lowers rewind_from and bumps rewind_seq instead, so
+    promotion goes back for rows it has already moved past. Re-writing the
+    newest candle held is not a rewind: it is where every fetch resumes.
+    """
+    advanced = {}
+    with conn.cursor() as cur:
+        for (symbol, interval, exchange), (first_ts, last_ts) in bounds.items():
+            cur.execute(
+                """
+                INSERT INTO bronze.ingest_watermark (
+                    symbol,
+                    interval,
+                    exchange,
+                    last_timestamp
+                )
+                VALUES (%(symbol)s, %(interval)s, %(exchange)s, %(last)s)
+                ON CONFLICT (symbol, interval, exchange) DO UPDATE
+                SET last_timestamp = GREATEST(
+                        bronze.ingest_watermark.last_timestamp,
+                        EXCLUDED.last_timestamp
+                    ),
+                    rewind_from = CASE
+                        WHEN %(first)s < bronze.ingest_watermark.last_timestamp
+                        THEN LEAST(bronze.ingest_watermark.rewind_from, %(first)s)
+                        ELSE bronze.ingest_watermark.rewind_from
+                    END,
+                    rewind_seq = bronze.ingest_watermark.rewind_seq + (
+                        %(first)s < bronze.ingest_watermark.last_timestamp
+                    )::int,
+                    updated_at = now()
+                RETURNING last_timestamp
+                """,
+                {
+                    "symbol": symbol,
+                    "interval": interval,
+                    "exchange": exchange,
+                    "last": last_ts,
+                    "first": first_ts,
+                },
+            )
+            advanced[(symbol, interval, exchange)] = cur.fetchone()[0]
+
+    return advanced
+
+
+RAW_COLUMNS = (
+    "timestamp",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "instrument_id",
+)
+RAW_KEY = ("instrument_id", "timestamp")
 
 
 def insert_rows(conn, rows):
     if not rows:
         return
 
-    with conn.cursor() as cur:
-        cur.executemany(
-            """
-            INSERT INTO bronze.raw_ohlc (
-                timestamp,
-                open,
-                high,
-                low,
-                close,
-                volume,
-                symbol,
-                interval,
-                exchange
+    copy_merge(conn, "bronze.raw_ohlc", RAW_COLUMNS, encode_rows(conn, rows), RAW_KEY)
+    advanced = advance_watermarks(conn, bounds_by_instrument(rows))
+    conn.commit()
+
+    # cache only what is durable
+    with _WATERMARKS_LOCK:
+        _WATERMARKS.update(advanced)
+
+
+def insert_batches(conn, batches):
+    # columnar twin of insert_rows: one binary COPY and one commit for
+    # any number of batches, across instruments
+    if not batches:
+        return
+
+    field_sets = []
+    bounds = {}
+    for b in batches:
+        key = (b["symbol"], b["interval"], b["exchange"])
+        instrument_id = np.full(len(b["timestamp"]), get_instrument_id(conn, *key), dtype=np.int32)
+        field_sets.append([b["timestamp"], *b["ohlcv"].T, instrument_id])
+
+        lo, hi = int(b["timestamp"].min()), int(b["timestamp"].max())
+        if key in bounds:
+            lo, hi = min(lo, bounds[key][0]), max(hi, bounds[key][1])
+        bounds[key] = (lo, hi)
+
+    copy_merge_columns(conn, "bronze.raw_ohlc", RAW_COLUMNS, field_sets, RAW_KEY)
+    advanced = advance_watermarks(conn, bounds)
+    conn.commit()
+
+    with _WATERMARKS_LOCK:
+        _WATERMARKS.update(advanced)
+
+
+def prepare_partitions(conn, start_ts, end_ts):
+    # bronze/silver months for the range, plus the months ahead of it
+    for part in ensure_partitions(conn, start_ts, end_ts):
+        print(f"[partitions] created {part}")
+    conn.commit()
+
+# =========================================================
+# RUNTIME
+# =========================================================
+class IngestRuntime:
+    """Warm connections shared by every ingest task started from main().
+
+    Holds one keep-alive aiohttp session per exchange host and a bounded
+    psycopg2 pool, so a cycle over many symbols pays TCP/TLS setup and
+    Postgres auth once instead of per task. Blocking psycopg2 calls run on
+    a writer executor sized to the pool, so DB I/O never stalls the
+    event loop's HTTP fetches.
+    """
+
+    def __init__(self):
+        self.pool = ThreadedConnectionPool(
+            DB_POOL_MIN,
+            DB_POOL_MAX,
+            cursor_factory=metrics.cursor_factory(),
+            **DB_PARAMS,
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=DB_POOL_MAX,
+            thread_name_prefix="db-writer",
+        )
+        self.sessions = {}
+
+    def session(self, exchange):
+        if exchange not in self.sessions:
+            self.sessions[exchange] = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=HTTP_POOL_SIZE,
+                    keepalive_timeout=HTTP_KEEPALIVE,
+                    ttl_dns_cache=300,
+                ),
             )
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-            ON CONFLICT (timestamp, symbol, interval, exchange) DO NOTHING
-            """,
-            rows,
+        return self.sessions[exchange]
+
+    @contextmanager
+    def connection(self):
+        conn = self.pool.getconn()
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def _call_with_conn(self, fn, args):
+        with self.connection() as conn:
+            return fn(conn, *args)
+
+    async def run_db(self, fn, *args):
+        # one worker per pooled connection, so getconn() never runs dry
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            self._call_with_conn,
+            fn,
+            args,
         )
-    conn.commit()
+
+    async def close(self):
+        for session in self.sessions.values():
+            await session.close()
+        self.sessions.clear()
+        self.executor.shutdown(wait=True)
+        self.pool.closeall()
+
+# =========================================================
+# PAYLOAD DECODING
+# =========================================================
+
+def decode_candle_array(payload, width):
+    """Parse a JSON array of flat numeric rows into an (n, width) float64 matrix.
+
+    Kline pages are fixed-width rows of numbers or numeric strings, so with
+    brackets and quotes stripped the body is plain CSV that NumPy parses in
+    C, without materialising a Python object per field.
+    """
+    flat = payload.translate(None, b'[]"')
+
+    with warnings.catch_warnings():
+        # NumPy only warns (and truncates) on unparsable input
+        warnings.simplefilter("error", DeprecationWarning)
+        values = np.fromstring(flat, dtype=np.float64, sep=",")
+
+    if values.size % width:
+        raise ValueError(f"ragged candle payload: {values.size} values, width {width}")
+
+    return values.reshape(-1, width)
 
 # =========================================================
 # BINANCE
 # =========================================================
-async def fetch_binance(session, symbol, interval, start_ts):
+async def fetch_binance(session, symbol, interval, start_ts, end_ts=None):
     params = {
         "symbol": symbol,
         "interval": interval,
@@ -82,10 +312,15 @@ async def fetch_binance(session, symbol, interval, start_ts):
     }
     if start_ts is not None:
         params["startTime"] = start_ts + 1
-
-    async with session.get(BINANCE_URL, params=params) as r:
-        r.raise_for_status()
-        return await r.json()
+    if end_ts is not None:
+        params["endTime"] = end_ts
+
+    return await limited_get(
+        EXCHANGES["binance"]["limiter"],
+        session,
+        BINANCE_URL,
+        params,
+    )
 
 
 def normalize_binance(candles, symbol):
@@ -104,42 +339,54 @@ def normalize_binance(candles, symbol):
         for c in candles
     ]
 
+
+def normalize_binance_columns(payload, symbol):
+    # [open_time, o, h, l, c, v, close_time, quote_vol, trades, ...] x 12
+    raw = decode_candle_array(payload, 12)
+    if not len(raw):
+        return None
+
+    return {
+        "timestamp": raw[:, 0].astype(np.int64),  # ms, exact in float64
+        "ohlcv": raw[:, 1:6],
+        "symbol": symbol,
+        "interval": "1m",
+        "exchange": "binance",
+    }
+
 # =========================================================
 # KUCOIN
 # =========================================================
-async def fetch_kucoin(session, symbol, interval, start_ts):
+async def fetch_kucoin(session, symbol, interval, start_ts, end_ts=None):
     params = {
         "symbol": symbol.replace("USDT", "-USDT"),
         "type": interval,  # "1min"
     }
 
     if start_ts is not None:
-        params["startAt"] = int(start_ts / 1000)
-
-    for attempt in range(3):  # retry 3 times
-        try:
-            async with session.get(
-                "https://api.kucoin.com/api/v1/market/candles",
-                params=params,
-                timeout=aiohttp.ClientTimeout(
-                    total=15,
-                    connect=5,
-                    sock_connect=5,
-                    sock_read=10,
-                ),
-            ) as r:
-                r.raise_for_status()
-                data = await r.json()
-
-                if data.get("code") != "200000":
-                    raise RuntimeError(data)
+        # startAt is inclusive: resume at the minute after the one held
+        params["startAt"] = (start_ts - start_ts % INTERVAL_MS + INTERVAL_MS) // 1000
+    if end_ts is not None:
+        params["endAt"] = int(end_ts / 1000)
+
+    body = await limited_get(
+        EXCHANGES["kucoin"]["limiter"],
+        session,
+        KUCOIN_SPOT_URL,
+        params,
+        timeout=aiohttp.ClientTimeout(
+            total=15,
+            connect=5,
+            sock_connect=5,
+            sock_read=10,
+        ),
+    )
 
-                return data["data"]
+    # envelope check without decoding the candle array
+    if b'"code":"200000"' not in body[:32]:
+        raise RuntimeError(body[:200])
 
-        except Exception as e:
-            if attempt == 2:
-                raise
-            await asyncio.sleep(2)
+    return body
 
 
 
@@ -164,58 +411,332 @@ def normalize_kucoin(candles, symbol):
 
     return rows
 
+
+def normalize_kucoin_columns(payload, symbol):
+    # {"code": ..., "data": [[time(s), open, close, high, low, volume, turnover]]}
+    start = payload.index(b"[", payload.index(b'"data"'))
+    raw = decode_candle_array(payload[start:payload.rindex(b"]") + 1], 7)
+    if not len(raw):
+        return None
+
+    return {
+        "timestamp": raw[:, 0].astype(np.int64) * 1000,  # seconds → ms
+        "ohlcv": raw[:, [1, 3, 4, 2, 5]],
+        "symbol": symbol,
+        "interval": "1m",
+        "exchange": "kucoin",
+    }
+
 # =========================================================
 # ADAPTER REGISTRY
 # =========================================================
+# fetch → raw page body; normalize_columns → columnar batch for the COPY
+# path; normalize → row tuples for already-decoded candles (websocket)
 EXCHANGES = {
     "binance": {
         "fetch": fetch_binance,
         "normalize": normalize_binance,
+        "normalize_columns": normalize_binance_columns,
         "interval": "1m",
+        "page_size": 1000,
+        "max_concurrency": 8,
+        # 6000 request weight / minute per IP, klines cost 2
+        "limiter": RateLimiter(
+            name="binance",
+            budget=6000,
+            window=60,
+            cost=2,
+            used_header="X-MBX-USED-WEIGHT-1M",
+        ),
     },
     "kucoin": {
         "fetch": fetch_kucoin,
         "normalize": normalize_kucoin,
+        "normalize_columns": normalize_kucoin_columns,
         "interval": "1min",
+        "page_size": 1500,
+        "max_concurrency": 4,
+        # public pool: 2000 weight / 30s, klines cost 3
+        "limiter": RateLimiter(
+            name="kucoin",
+            budget=2000,
+            window=30,
+            cost=3,
+            remaining_header="gw-ratelimit-remaining",
+            reset_header="gw-ratelimit-reset",
+        ),
     },
 }
 
 # =========================================================
-# INGESTION
+# PRODUCERS
 # =========================================================
-async def ingest(symbol: str, exchange: str):
+#
+# Fetchers only put raw pages on the queue; normalizing and writing happen
+# in the downstream stages. A full page queue blocks the fetchers, which
+# caps memory no matter how many instruments are in flight.
+
+_EXCHANGE_SEMAPHORES = {}
+
+
+def exchange_semaphore(exchange):
+    # one limiter per exchange, shared by every symbol fetching on it
+    if exchange not in _EXCHANGE_SEMAPHORES:
+        _EXCHANGE_SEMAPHORES[exchange] = asyncio.Semaphore(
+            EXCHANGES[exchange]["max_concurrency"]
+        )
+    return _EXCHANGE_SEMAPHORES[exchange]
+
+
+def split_windows(start_ts, end_ts, page_size):
+    """Split the inclusive ms range [start_ts, end_ts] into page-sized windows."""
+    span = page_size * INTERVAL_MS
+    windows = []
+
+    ws = start_ts - start_ts % INTERVAL_MS
+    while ws <= end_ts:
+        we = min(ws + span - INTERVAL_MS, end_ts)
+        windows.append((ws, we))
+        ws = we + INTERVAL_MS
+
+    return windows
+
+
+def last_closed_ms():
+    # last millisecond of the newest closed minute
+    now = int(time.time() * 1000)
+    return now - now % INTERVAL_MS - 1
+
+
+async def fetch_latest(runtime, symbol, exchange, pages):
+    # one page from the watermark onwards, closed candles only: the open
+    # one would move the watermark past itself and never be corrected
     cfg = EXCHANGES[exchange]
+    last_ts = await runtime.run_db(get_last_timestamp, symbol, "1m", exchange)
+    end_ts = last_closed_ms()
+    if last_ts is not None and last_ts + INTERVAL_MS > end_ts:
+        return
 
-    conn = get_conn()
-    last_ts = get_last_timestamp(conn, symbol, "1m", exchange)
+    # without a watermark the page is the newest one, which can start in
+    # the previous month
+    first_ts = end_ts - cfg["page_size"] * INTERVAL_MS
+    if last_ts is not None:
+        first_ts = min(first_ts, last_ts)
+    await runtime.run_db(prepare_partitions, first_ts, end_ts)
 
-    async with aiohttp.ClientSession() as session:
+    async with exchange_semaphore(exchange):
         raw = await cfg["fetch"](
-            session,
+            runtime.session(exchange),
             symbol,
             cfg["interval"],
             last_ts,
+            end_ts,
         )
+        await pages.put((symbol, exchange, raw))
 
-    if not raw:
-        print(f"[{exchange}] no new data")
-        conn.close()
-        return
 
-    rows = cfg["normalize"](raw, symbol)
-    insert_rows(conn, rows)
+async def fetch_range(runtime, symbol, exchange, start_ts, end_ts, pages):
+    # every page-sized window in [start_ts, end_ts], concurrently
+    cfg = EXCHANGES[exchange]
+    sem = exchange_semaphore(exchange)
+    session = runtime.session(exchange)
+
+    async def fetch_window(ws, we):
+        async with sem:
+            # fetchers treat start_ts as the last candle already held
+            raw = await cfg["fetch"](
+                session,
+                symbol,
+                cfg["interval"],
+                ws - 1,
+                we,
+            )
+            # put while holding the slot, so a full queue stops new fetches
+            await pages.put((symbol, exchange, raw))
+
+    await asyncio.gather(*(
+        fetch_window(ws, we)
+        for ws, we in split_windows(start_ts, end_ts, cfg["page_size"])
+    ))
+
+# =========================================================
+# PIPELINE
+# =========================================================
+_DONE = object()
+
+
+async def normalize_stage(pages, batches):
+    while True:
+        page = await pages.get()
+        metrics.set_gauge("queue_depth", pages.qsize(), queue="pages")
+        if page is _DONE:
+            await batches.put(_DONE)
+            return
+
+        symbol, exchange, raw = page
+        with metrics.timed("normalize_seconds", exchange=exchange):
+            batch = EXCHANGES[exchange]["normalize_columns"](raw, symbol)
+        if batch is not None:
+            await batches.put(batch)
+
+
+async def write_stage(runtime, batches):
+    # coalesce batches across instruments into few, large commits
+    loop = asyncio.get_running_loop()
+    counts = {}
+    done = False
+
+    while not done:
+        batch = await batches.get()
+        metrics.set_gauge("queue_depth", batches.qsize(), queue="batches")
+        if batch is _DONE:
+            break
+
+        group = [batch]
+        rows = len(batch["timestamp"])
+        deadline = loop.time() + WRITER_LINGER
+
+        while rows < WRITER_MAX_ROWS:
+            try:
+                batch = await asyncio.wait_for(
+                    batches.get(),
+                    max(0, deadline - loop.time()),
+                )
+            except asyncio.TimeoutError:
+                break
+            if batch is _DONE:
+                done = True
+                break
+            group.append(batch)
+            rows += len(batch["timestamp"])
+
+        t0 = time.perf_counter()
+        await runtime.run_db(insert_batches, group)
+        metrics.record_stage("bronze_write", rows, time.perf_counter() - t0)
+
+        for b in group:
+            key = (b["symbol"], b["exchange"])
+            counts[key] = counts.get(key, 0) + len(b["timestamp"])
+
+    return counts
+
+
+async def run_pipeline(runtime, producers):
+    """Run fetch → normalize → write for a set of page producers.
+
+    Each producer is called with the page queue. Returns inserted-candle
+    counts per (symbol, exchange); duplicates skipped by the merge are
+    still counted, as before.
+    """
+    pages = asyncio.Queue(maxsize=PAGE_QUEUE_SIZE)
+    batches = asyncio.Queue(maxsize=BATCH_QUEUE_SIZE)
+
+    async def feed():
+        await asyncio.gather(*(produce(pages) for produce in producers))
+        await pages.put(_DONE)
+
+    tasks = [
+        asyncio.create_task(feed()),
+        asyncio.create_task(normalize_stage(pages, batches)),
+        asyncio.create_task(write_stage(runtime, batches)),
+    ]
+    try:
+        # any stage failing tears the others down instead of deadlocking
+        results = await asyncio.gather(*tasks)
+    finally:
+        for t in tasks:
+            t.cancel()
+
+    return results[-1]
+
+
+def report(counts, instruments):
+    for symbol, exchange in instruments:
+        n = counts.get((symbol, exchange), 0)
+        if n:
+            print(f"[{exchange}] inserted {n} candles")
+        else:
+            print(f"[{exchange}] no new data")
+
+# =========================================================
+# BACKFILL
+# =========================================================
+async def backfill(
+    runtime: IngestRuntime,
+    symbol: str,
+    exchange: str,
+    start_ts: int,
+    end_ts: int,
+):
+    await runtime.run_db(prepare_partitions, start_ts, end_ts)
+    counts = await run_pipeline(
+        runtime,
+        [partial(fetch_range, runtime, symbol, exchange, start_ts, end_ts)],
+    )
+    report(counts, [(symbol, exchange)])
+
 
-    print(f"[{exchange}] inserted {len(rows)} candles")
-    conn.close()
+def parse_ts(value):
+    # ISO date/datetime (UTC if naive) → epoch ms
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
 
 # =========================================================
 # MAIN
 # =========================================================
+INSTRUMENTS = [
+    ("BTCUSDT", "binance"),
+    ("BTCUSDT", "kucoin"),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="1m OHLC ingestion")
+    parser.add_argument("--start", help="backfill start, ISO date (UTC)")
+    parser.add_argument("--end", help="backfill end, ISO date (UTC), default now")
+    return parser.parse_args()
+
+
+async def ingest_all(runtime, start_ts=None, end_ts=None):
+    """Ingest every instrument in INSTRUMENTS, from the watermark or over
+    [start_ts, end_ts]. Returns the number of candles written."""
+    if start_ts is None:
+        producers = [
+            partial(fetch_latest, runtime, symbol, exchange)
+            for symbol, exchange in INSTRUMENTS
+        ]
+    else:
+        await runtime.run_db(prepare_partitions, start_ts, end_ts)
+
+        producers = [
+            partial(fetch_range, runtime, symbol, exchange, start_ts, end_ts)
+            for symbol, exchange in INSTRUMENTS
+        ]
+
+    # one pipeline for every instrument, so the writer can coalesce
+    counts = await run_pipeline(runtime, producers)
+    report(counts, INSTRUMENTS)
+    return sum(counts.values())
+
+
 async def main():
-    await asyncio.gather(
-        ingest("BTCUSDT", "binance"),
-        ingest("BTCUSDT", "kucoin"),
-    )
+    args = parse_args()
+    runtime = IngestRuntime()
+
+    now = int(datetime.now(timezone.utc).timestamp() * 1000)
+    metrics.serve()
+
+    try:
+        if args.start:
+            end_ts = parse_ts(args.end) if args.end else now
+            await ingest_all(runtime, parse_ts(args.start), end_ts)
+        else:
+            await ingest_all(runtime)
+    finally:
+        await runtime.close()
+        metrics.write_textfile()
 
 if __name__ == "__main__":
     asyncio.run(main())
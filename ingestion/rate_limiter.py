@@ -0,0 +1,172 @@
+import asyncio
+import aiohttp
+import random
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+
+from utils import metrics
+
+# =========================================================
+# TOKEN BUCKET
+# =========================================================
+
+RETRY_STATUSES = {418, 429, 500, 502, 503, 504}
+
+
+def retry_after_seconds(value):
+    # Retry-After is either delay-seconds or an HTTP-date; None if neither
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:  # HTTP-dates are GMT
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, when.timestamp() - time.time())
+
+
+class RateLimiter:
+    """Token bucket sized to an exchange's published request budget.
+
+    `budget` weight units refill evenly over `window` seconds and every
+    request costs `cost`. Response headers keep the bucket honest: a
+    used-weight header (Binance) or remaining/reset headers (KuCoin) clamp
+    the local tokens to what the server reports and pause the bucket once
+    the server's window is spent, and 418/429/Retry-After pause the bucket
+    and halve the refill rate, which then creeps back up on successful
+    responses (AIMD).
+    """
+
+    def __init__(
+        self,
+        budget,
+        window,
+        cost=1,
+        name=None,
+        used_header=None,
+        remaining_header=None,
+        reset_header=None,
+        max_backoff=60,
+    ):
+        self.capacity = budget
+        self.window = window
+        self.cost = cost
+        self.name = name  # metrics label
+        self.base_rate = budget / window
+        self.rate = self.base_rate
+        self.tokens = budget
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+        self.used_header = used_header
+        self.remaining_header = remaining_header
+        self.reset_header = reset_header
+        self.max_backoff = max_backoff
+
+        self.lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(
+            self.capacity,
+            self.tokens + (now - self.updated) * self.rate,
+        )
+        self.updated = now
+
+    async def acquire(self):
+        # waiters queue on the lock, so requests go out in arrival order
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= self.cost:
+                        self.tokens -= self.cost
+                        return
+                    wait = (self.cost - self.tokens) / self.rate
+
+                await asyncio.sleep(wait)
+
+    def observe(self, status, headers):
+        now = time.monotonic()
+        self._refill(now)
+
+        retry_after = headers.get("Retry-After")
+        if status in (418, 429) or retry_after:
+            pause = retry_after_seconds(retry_after) if retry_after else None
+            if pause is None:
+                pause = self.window / 10
+            self.blocked_until = max(self.blocked_until, now + pause)
+            self.tokens = 0
+            self.rate = max(self.base_rate / 16, self.rate / 2)
+            return
+
+        if self.used_header and self.used_header in headers:
+            used = int(headers[self.used_header])
+            self.tokens = min(self.tokens, self.capacity - used)
+
+            # the weight is counted per clock-aligned window: refilling
+            # before it rolls over would only buy 429s
+            if self.capacity - used < self.cost:
+                reset = self.window - time.time() % self.window
+                self.blocked_until = max(self.blocked_until, now + reset)
+
+        if self.remaining_header and self.remaining_header in headers:
+            remaining = int(headers[self.remaining_header])
+            self.tokens = min(self.tokens, remaining)
+
+            if remaining < self.cost and self.reset_header in headers:
+                reset = int(headers[self.reset_header]) / 1000  # ms
+                self.blocked_until = max(self.blocked_until, now + reset)
+
+        if status < 400:
+            self.rate = min(self.base_rate, self.rate + self.base_rate / 20)
+
+    def retry_delay(self, attempt):
+        # full-jitter exponential backoff, never earlier than a server pause
+        jitter = random.uniform(0, min(self.max_backoff, 0.5 * 2 ** attempt))
+        return max(self.blocked_until - time.monotonic(), jitter)
+
+# =========================================================
+# REQUEST
+# =========================================================
+
+async def limited_get(limiter, session, url, params, retries=5, timeout=None):
+    """GET `url` under `limiter`, retrying throttles and transient errors.
+
+    Returns the raw body. Non-retryable HTTP errors raise immediately.
+    """
+    for attempt in range(retries):
+        last = attempt == retries - 1
+        await limiter.acquire()
+        t0 = time.perf_counter()
+
+        try:
+            async with session.get(url, params=params, timeout=timeout) as r:
+                limiter.observe(r.status, r.headers)
+
+                if r.status < 400:
+                    body = await r.read()
+                    metrics.observe(
+                        "http_request_seconds",
+                        time.perf_counter() - t0,
+                        exchange=limiter.name,
+                    )
+                    return body
+
+                metrics.inc("http_errors_total", exchange=limiter.name, status=r.status)
+                if r.status not in RETRY_STATUSES or last:
+                    r.raise_for_status()
+
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            metrics.inc("http_errors_total", exchange=limiter.name, status=type(e).__name__)
+            if last:
+                raise
+
+        await asyncio.sleep(limiter.retry_delay(attempt))
@@ -0,0 +1,291 @@
+import asyncio
+import aiohttp
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from functools import partial
+from uuid import uuid4
+from dotenv import load_dotenv
+from pathlib import Path
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+load_dotenv(BASE_DIR / "config" / "setting.env")
+
+from ingestion.ingest_1m import (
+    INSTRUMENTS,
+    INTERVAL_MS,
+    IngestRuntime,
+    backfill,
+    get_last_timestamp,
+    insert_rows,
+    normalize_binance,
+    normalize_kucoin,
+    prepare_partitions,
+)
+from utils import metrics
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # stdlib fallback: same results, slower
+    from json import loads as json_loads
+
+# point these at a local replay server to run against recorded frames
+BINANCE_WS_URL = os.getenv(
+    "BINANCE_WS_URL", "wss://data-stream.binance.vision/stream"
+)
+KUCOIN_WS_URL = os.getenv("KUCOIN_WS_URL")  # skips the bullet handshake
+KUCOIN_BULLET_URL = "https://api.kucoin.com/api/v1/bullet-public"
+
+STREAM_FLUSH_SECONDS = float(os.getenv("STREAM_FLUSH_SECONDS", 0.5))
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 500))
+STREAM_MAX_BACKOFF = 30
+PARTITION_CHECK_SECONDS = 3600
+
+# =========================================================
+# BINANCE
+# =========================================================
+
+def parse_binance_frame(msg):
+    # closed kline → (symbol, REST-shaped candle); anything else → None
+    k = msg.get("k")
+    if msg.get("e") != "kline" or not k or not k.get("x"):
+        return None
+
+    return msg["s"], [k["t"], k["o"], k["h"], k["l"], k["c"], k["v"]]
+
+
+async def stream_binance(runtime, symbols, queue, on_ready):
+    streams = "/".join(f"{s.lower()}@kline_1m" for s in symbols)
+    session = runtime.session("binance")
+
+    async with session.ws_connect(
+        f"{BINANCE_WS_URL}?streams={streams}",
+        heartbeat=30,
+    ) as ws, supervised(ws, on_ready):
+        async for frame in ws:
+            if frame.type != aiohttp.WSMsgType.TEXT:
+                continue
+
+            parsed = parse_binance_frame(json_loads(frame.data).get("data", {}))
+            if parsed is None:
+                continue
+
+            symbol, candle = parsed
+            await queue.put(normalize_binance([candle], symbol))
+
+# =========================================================
+# KUCOIN
+# =========================================================
+
+def kucoin_closed_candle(pending, symbol, candle):
+    # KuCoin pushes in-progress updates with no closed flag: a candle is
+    # final once an update for a later start time arrives
+    prev = pending.get(symbol)
+    pending[symbol] = candle
+
+    if prev is not None and int(candle[0]) > int(prev[0]):
+        return prev
+    return None
+
+
+async def kucoin_endpoint(session):
+    if KUCOIN_WS_URL:
+        return KUCOIN_WS_URL, 18_000
+
+    async with session.post(KUCOIN_BULLET_URL) as r:
+        r.raise_for_status()
+        data = (await r.json())["data"]
+
+    server = data["instanceServers"][0]
+    url = f"{server['endpoint']}?token={data['token']}&connectId={uuid4().hex}"
+    return url, server["pingInterval"]
+
+
+async def kucoin_ping(ws, interval_ms):
+    while True:
+        await asyncio.sleep(interval_ms / 1000)
+        await ws.send_json({"id": uuid4().hex, "type": "ping"})
+
+
+async def stream_kucoin(runtime, symbols, queue, on_ready):
+    session = runtime.session("kucoin")
+    url, ping_ms = await kucoin_endpoint(session)
+    pending = {}
+
+    async with session.ws_connect(url) as ws:
+        for symbol in symbols:
+            await ws.send_json({
+                "id": uuid4().hex,
+                "type": "subscribe",
+                "topic": f"/market/candles:{symbol.replace('USDT', '-USDT')}_1min",
+                "privateChannel": False,
+                "response": True,
+            })
+
+        ping = asyncio.create_task(kucoin_ping(ws, ping_ms))
+        try:
+            async with supervised(ws, on_ready):
+                async for frame in ws:
+                    if frame.type != aiohttp.WSMsgType.TEXT:
+                        continue
+
+                    msg = json_loads(frame.data)
+                    if msg.get("type") != "message":
+                        continue
+
+                    data = msg["data"]
+                    symbol = data["symbol"].replace("-", "")
+                    closed = kucoin_closed_candle(pending, symbol, data["candles"])
+                    if closed is not None:
+                        await queue.put(normalize_kucoin([closed], symbol))
+        finally:
+            ping.cancel()
+
+
+STREAMS = {
+    "binance": stream_binance,
+    "kucoin": stream_kucoin,
+}
+
+# =========================================================
+# GAP FILL / RECONNECT
+# =========================================================
+
+class GapFillError(Exception):
+    """The REST backfill started on connect failed; the connection is
+    restarted so the backfill runs again."""
+
+
+@asynccontextmanager
+async def supervised(ws, on_ready):
+    # on_ready runs beside the frame loop; if it fails the socket is
+    # closed, which ends the loop, and the failure is raised on exit
+    task = asyncio.create_task(on_ready())
+
+    def check(t):
+        if not t.cancelled() and t.exception() is not None:
+            asyncio.create_task(ws.close())
+
+    task.add_done_callback(check)
+    try:
+        yield
+    finally:
+        task.cancel()
+
+    if task.done() and not task.cancelled() and task.exception() is not None:
+        raise GapFillError(repr(task.exception())) from task.exception()
+
+
+async def gap_fill(runtime, exchange, fill_from):
+    # REST backfill from each symbol's recorded start up to the last
+    # *closed* minute, so a partial candle never lands ahead of its closed
+    # stream version. A symbol leaves fill_from only once its range is
+    # written: the stream advances the watermark meanwhile, so a failed
+    # fill could not be found again from it
+    now = int(time.time() * 1000)
+    end_ts = now - now % INTERVAL_MS - INTERVAL_MS
+
+    for symbol, start_ts in list(fill_from.items()):
+        if start_ts <= end_ts:
+            await backfill(runtime, symbol, exchange, start_ts, end_ts)
+        del fill_from[symbol]
+
+
+async def run_stream(runtime, exchange, symbols, queue):
+    delay = 1
+    fill_from = {}  # symbol → first minute still to backfill
+
+    while True:
+        try:
+            # taken before connecting, so the stream cannot move the
+            # watermark past minutes it never received
+            for symbol in symbols:
+                if symbol not in fill_from:
+                    last_ts = await runtime.run_db(get_last_timestamp, symbol, "1m", exchange)
+                    if last_ts is not None:
+                        fill_from[symbol] = last_ts + INTERVAL_MS
+
+            on_ready = partial(gap_fill, runtime, exchange, fill_from)
+            await STREAMS[exchange](runtime, symbols, queue, on_ready)
+            delay = 0.5
+            print(f"[{exchange}] stream closed, reconnecting")
+        except GapFillError as e:
+            print(f"[{exchange}] gap fill failed: {e}, reconnect in {delay}s")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError) as e:
+            print(f"[{exchange}] stream error: {e!r}, retry in {delay}s")
+
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, STREAM_MAX_BACKOFF)
+
+# =========================================================
+# WRITER
+# =========================================================
+
+async def stream_writer(runtime, queue):
+    loop = asyncio.get_running_loop()
+    batch = []
+    deadline = None
+
+    while True:
+        timeout = max(0, deadline - loop.time()) if batch else None
+        try:
+            rows = await asyncio.wait_for(queue.get(), timeout)
+            metrics.set_gauge("queue_depth", queue.qsize(), queue="stream")
+            if not batch:
+                deadline = loop.time() + STREAM_FLUSH_SECONDS
+            batch.extend(rows)
+            if len(batch) < STREAM_BATCH_SIZE:
+                continue
+        except asyncio.TimeoutError:
+            pass
+
+        t0 = time.perf_counter()
+        await runtime.run_db(insert_rows, batch)
+        metrics.record_stage("stream_write", len(batch), time.perf_counter() - t0)
+        print(f"[stream] inserted {len(batch)} candles")
+        batch = []
+
+
+async def keep_partitions(runtime):
+    # the stream outlives the months created ahead of it at startup
+    while True:
+        now = int(time.time() * 1000)
+        await runtime.run_db(prepare_partitions, now, now)
+        await asyncio.sleep(PARTITION_CHECK_SECONDS)
+
+# =========================================================
+# MAIN
+# =========================================================
+async def main():
+    runtime = IngestRuntime()
+    queue = asyncio.Queue()
+
+    by_exchange = {}
+    for symbol, exchange in INSTRUMENTS:
+        by_exchange.setdefault(exchange, []).append(symbol)
+
+    # the stream never finishes a cycle, so the textfile is rewritten on
+    # a timer
+    metrics.serve()
+    metrics.write_textfile_every()
+
+    try:
+        await asyncio.gather(
+            keep_partitions(runtime),
+            stream_writer(runtime, queue),
+            *(
+                run_stream(runtime, exchange, symbols, queue)
+                for exchange, symbols in by_exchange.items()
+            ),
+        )
+    finally:
+        await runtime.close()
+        metrics.write_textfile()
+
+if __name__ == "__main__":
+    asyncio.run(main())
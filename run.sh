@@ -0,0 +1,7 @@
+#!/usr/bin/env bash
+# ingest → silver → gold in one process; pass --every N to keep running,
+# see aggregation/run_aggregation.py for the options
+set -euo pipefail
+
+cd "$(dirname "$0")"
+exec python aggregation/run_aggregation.py "$@"
@@ -1,15 +1,20 @@
 import psycopg2
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
-from psycopg2.extras import execute_batch
 
 # =========================================================
 # ENV
 # =========================================================
 BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
 load_dotenv(BASE_DIR / "config" / "setting.env")
 
+from utils.bulk_loader import copy_merge
+from utils.instruments import encode_rows, get_instrument_id
+from aggregation.mv_ohlc import TIMEFRAMES
+
 DB_PARAMS = {
     "dbname": os.getenv("DB_NAME"),
     "user": os.getenv("DB_USER"),
@@ -21,79 +26,251 @@ DB_PARAMS = {
 def get_conn():
     return psycopg2.connect(**DB_PARAMS)
 
+PROMOTE_CHUNK_ROWS = int(os.getenv("PROMOTE_CHUNK_ROWS", 50_000))
+INTERVAL_MS = 60_000  # 1m candles
+
 # =========================================================
-# LAST TS
+# WATERMARKS
 # =========================================================
 
-def get_max_timestamp_fact(conn):
+def get_pending_instruments(conn):
+    # instruments whose bronze watermark is ahead of their silver one, or
+    # with rows written behind it (see bronze.ingest_watermark.rewind_from)
     with conn.cursor() as cur:
         cur.execute("""
-            SELECT COALESCE(MAX(timestamp), 0)
-            FROM silver.fact_candles
+            SELECT
+                b.symbol,
+                b.interval,
+                b.exchange,
+                COALESCE(s.last_timestamp, 0),
+                b.last_timestamp,
+                b.rewind_from,
+                b.rewind_seq
+            FROM bronze.ingest_watermark b
+            LEFT JOIN silver.promote_watermark s
+              USING (symbol, interval, exchange)
+            WHERE b.interval = '1m'
+              AND (
+                  b.last_timestamp > COALESCE(s.last_timestamp, 0)
+                  OR b.rewind_from IS NOT NULL
+              )
+            ORDER BY b.exchange, b.symbol
         """)
-        return cur.fetchone()[0]
+        return cur.fetchall()
+
 
+def rewind_downstream(cur, symbol, exchange, from_ts):
+    """Move the rollup, feature, composite and export watermarks back to the
+    last minute before from_ts, so the next run of each stage rebuilds the
+    buckets holding from_ts and everything after them.
+
+    The watermark has to land on a dim_time epoch: readers join it to
+    dim_time for the bucket to resume from. The feature watermark's
+    revision is bumped, so cached closed bars are read again.
+    """
+    for table, extra in (
+        ("silver.rollup_watermark", ""),
+        ("gold.feature_watermark", "revision = revision + 1,"),
+        ("gold.composite_watermark", ""),
+    ):
+        cur.execute(f"""
+            UPDATE {table}
+            SET last_timestamp = %s,
+                {extra}
+                updated_at = now()
+            WHERE symbol = %s
+              AND exchange = %s
+              AND last_timestamp >= %s
+        """, (from_ts - INTERVAL_MS, symbol, exchange, from_ts))
+
+    # exported bars are keyed on tf_time: rewind to before the bar
+    # holding from_ts
+    for tf, spec in TIMEFRAMES.items():
+        cur.execute(f"""
+            UPDATE gold.export_watermark e
+            SET last_tf_time = t.{spec["key"]} - 1,
+                updated_at = now()
+            FROM silver.dim_time t
+            WHERE t.epoch = %s
+              AND e.symbol = %s
+              AND e.exchange = %s
+              AND e.timeframe = %s
+              AND e.last_tf_time >= t.{spec["key"]}
+        """, (from_ts, symbol, exchange, tf))
+
+
+def settle_rewind(conn, symbol, interval, exchange, last_ts, rewind_from, rewind_seq):
+    # rebuild downstream from rows that were behind the promote watermark,
+    # and clear rewind_from unless a writer has landed rows behind it
+    # meanwhile: those may sit in a range already promoted, so the next
+    # run has to go back again
+    with conn.cursor() as cur:
+        if rewind_from <= last_ts:
+            rewind_downstream(cur, symbol, exchange, rewind_from)
+
+        cur.execute("""
+            UPDATE bronze.ingest_watermark
+            SET rewind_from = NULL
+            WHERE symbol = %s
+              AND interval = %s
+              AND exchange = %s
+              AND rewind_seq = %s
+        """, (symbol, interval, exchange, rewind_seq))
+
+    conn.commit()
 
 # =========================================================
-# FETCH RAW CANDLES
+# PROMOTE CHUNK
 # =========================================================
-def fetch_raw_candles(conn, last_ts):
+
+def get_chunk_end(conn, instrument_id, last_ts, target_ts):
+    # timestamp of the PROMOTE_CHUNK_ROWS-th bronze row past last_ts
     with conn.cursor() as cur:
         cur.execute("""
-            SELECT
+            SELECT timestamp
+            FROM bronze.raw_ohlc
+            WHERE instrument_id = %s
+              AND timestamp > %s
+              AND timestamp <= %s
+            ORDER BY timestamp
+            OFFSET %s
+            LIMIT 1
+        """, (instrument_id, last_ts, target_ts, PROMOTE_CHUNK_ROWS - 1))
+        row = cur.fetchone()
+        return row[0] if row else target_ts
+
+
+def promote_chunk(conn, symbol, interval, exchange, instrument_id, last_ts, chunk_end):
+    # copy (last_ts, chunk_end] in-database and advance the watermark
+    # in the same transaction
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO silver.fact_candles (
                 timestamp,
                 open,
                 high,
                 low,
                 close,
                 volume,
-                symbol,
-                interval,
-                exchange
-            FROM bronze.raw_ohlc
-            WHERE interval = '1m'
-              AND timestamp > %s
-            ORDER BY timestamp  
-        """, (last_ts,))
-        return cur.fetchall()
-
-# =========================================================
-# INSERT FACT CANDLES
-# =========================================================
-def insert_fact_candles(conn, rows):
-    with conn.cursor() as cur:
-        execute_batch(cur, """
-            INSERT INTO silver.fact_candles (
+                instrument_id
+            )
+            SELECT
                 timestamp,
                 open,
                 high,
                 low,
                 close,
                 volume,
+                instrument_id
+            FROM bronze.raw_ohlc
+            WHERE instrument_id = %s
+              AND timestamp > %s
+              AND timestamp <= %s
+            ON CONFLICT (instrument_id, timestamp) DO NOTHING
+        """, (instrument_id, last_ts, chunk_end))
+        inserted = cur.rowcount
+
+        cur.execute("""
+            INSERT INTO silver.promote_watermark (
                 symbol,
                 interval,
-                exchange
+                exchange,
+                last_timestamp
             )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (timestamp, symbol, exchange) DO NOTHING
-        """, rows, page_size=1000)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (symbol, interval, exchange) DO UPDATE
+            SET last_timestamp = GREATEST(
+                    silver.promote_watermark.last_timestamp,
+                    EXCLUDED.last_timestamp
+                ),
+                updated_at = now()
+        """, (symbol, interval, exchange, chunk_end))
 
     conn.commit()
+    return inserted
 
-def run():
-    conn = get_conn()
+# =========================================================
+# INSERT FACT CANDLES
+# =========================================================
+FACT_COLUMNS = (
+    "timestamp",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "instrument_id",
+)
+FACT_KEY = ("instrument_id", "timestamp")
+
+
+def insert_fact_candles(conn, rows):
+    copy_merge(conn, "silver.fact_candles", FACT_COLUMNS, encode_rows(conn, rows), FACT_KEY)
+    conn.commit()
+
+# =========================================================
+# RUN
+# =========================================================
+
+def promote_range(conn, symbol, interval, exchange, instrument_id, last_ts, target_ts):
+    total = 0
+    while last_ts < target_ts:
+        chunk_end = get_chunk_end(conn, instrument_id, last_ts, target_ts)
+        total += promote_chunk(
+            conn, symbol, interval, exchange, instrument_id, last_ts, chunk_end
+        )
+        last_ts = chunk_end
+    return total
+
+
+def promote_instrument(
+    conn, symbol, interval, exchange, last_ts, target_ts, rewind_from=None, rewind_seq=0
+):
+    instrument_id = get_instrument_id(conn, symbol, interval, exchange)
+
+    # rows written behind the watermark first; the watermark itself never
+    # moves back, and rewind_from is only cleared once they are in, so a
+    # crash part-way redoes the range
+    total = 0
+    if rewind_from is not None and rewind_from <= last_ts:
+        total += promote_range(
+            conn, symbol, interval, exchange, instrument_id, rewind_from - 1, last_ts
+        )
 
-    last_ts = get_max_timestamp_fact(conn)
-    rows = fetch_raw_candles(conn, last_ts)
+    total += promote_range(
+        conn, symbol, interval, exchange, instrument_id, last_ts, target_ts
+    )
 
-    if rows:
-        insert_fact_candles(conn, rows)
-        print(f"[fact_candles] inserted {len(rows)} rows")
-    else:
+    if rewind_from is not None:
+        settle_rewind(conn, symbol, interval, exchange, last_ts, rewind_from, rewind_seq)
+
+    return total
+
+
+def promote_pending(conn):
+    pending = get_pending_instruments(conn)
+    if not pending:
         print("[fact_candles] no new data")
+        return 0
+
+    # each instrument advances on its own watermark, so a late exchange
+    # is never skipped by another one that already moved ahead
+    total = 0
+    for symbol, interval, exchange, last_ts, target_ts, rewind_from, rewind_seq in pending:
+        n = promote_instrument(
+            conn, symbol, interval, exchange, last_ts, target_ts, rewind_from, rewind_seq
+        )
+        print(f"[fact_candles] {exchange} {symbol}: inserted {n} rows")
+        total += n
 
+    return total
+
+
+def run():
+    conn = get_conn()
+    promote_pending(conn)
     conn.close()
 
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
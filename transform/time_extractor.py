@@ -1,16 +1,19 @@
 import psycopg2
 import os
+import sys
+import numpy as np
 from pathlib import Path
 from dotenv import load_dotenv
-from datetime import datetime, timezone
-from psycopg2.extras import execute_batch
 
 # =========================================================
 # ENV
 # =========================================================
 BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
 load_dotenv(BASE_DIR / "config" / "setting.env")
 
+from utils.bulk_loader import copy_merge_columns
+
 DB_PARAMS = {
     "dbname": os.getenv("DB_NAME"),
     "user": os.getenv("DB_USER"),
@@ -22,29 +25,52 @@ DB_PARAMS = {
 def get_conn():
     return psycopg2.connect(**DB_PARAMS)
 
-# =========================================================
-# DISTINCT TIMESTAMP
-# =========================================================
-
-def get_distinct_timestamp(conn):
-   with conn.cursor() as cur:
-       cur.execute("""
-       SELECT DISTINCT timestamp
-       FROM bronze.raw_ohlc;
-       """)
-       return [row[0] for row in cur.fetchall()]
+INTERVAL_MS = 60_000  # dim_time grain: one row per minute
+HOUR_MS = 3_600_000
+DAY_MS = 86_400_000
+UTC8_MS = 8 * HOUR_MS  # reporting timezone, see README
+DIM_TIME_CHUNK = int(os.getenv("DIM_TIME_CHUNK", 100_000))  # minutes per insert
 
 # =========================================================
-# GET EXISTING TIMESTAMP
+# TIME BOUNDS
 # =========================================================
 
-def get_existing_dim_timestamps(conn):
+def get_time_bounds(conn):
+    # index/watermark lookups in one round trip; bronze's key leads with
+    # instrument_id, so its minimum is taken per instrument
     with conn.cursor() as cur:
         cur.execute("""
-            SELECT epoch
-            FROM silver.dim_time
+            SELECT
+                (SELECT MIN(epoch) FROM silver.dim_time),
+                (SELECT MAX(epoch) FROM silver.dim_time),
+                (
+                    SELECT MIN(r.first_ts)
+                    FROM silver.dim_instrument i
+                    CROSS JOIN LATERAL (
+                        SELECT MIN(timestamp) AS first_ts
+                        FROM bronze.raw_ohlc
+                        WHERE instrument_id = i.instrument_id
+                    ) r
+                ),
+                (SELECT MAX(last_timestamp) FROM bronze.ingest_watermark)
         """)
-        return {row[0] for row in cur.fetchall()}
+        return cur.fetchone()
+
+
+def get_missing_ranges(dim_min, dim_max, raw_min, raw_max):
+    # dim_time is a contiguous minute grid, so only its two ends can grow:
+    # forward for new data, backward when older history is backfilled
+    if raw_min is None or raw_max is None:
+        return []
+    if dim_min is None:
+        return [(raw_min, raw_max)]
+
+    ranges = []
+    if raw_min < dim_min:
+        ranges.append((raw_min, dim_min - INTERVAL_MS))
+    if raw_max > dim_max:
+        ranges.append((dim_max + INTERVAL_MS, raw_max))
+    return ranges
 
 # =========================================================
 # SESSION CHECKER
@@ -60,99 +86,188 @@ def get_session(utc_hour: int) -> str:
     else:
         return "OFF"
 
+# =========================================================
+# HOUR LOOKUP TABLES
+# =========================================================
+
+# session, killzone and overlap flags depend only on the UTC hour
+HOURS = np.arange(24)
+SESSION_BY_HOUR = np.array([get_session(h) for h in HOURS])
+LONDON_KILLZONE_BY_HOUR = (HOURS >= 7) & (HOURS < 10)
+NY_KILLZONE_BY_HOUR = (HOURS >= 12) & (HOURS < 15)
+LONDON_NY_OVERLAP_BY_HOUR = (HOURS >= 13) & (HOURS < 16)
+
 # =========================================================
 # BUILDING DIM TIME
 # =========================================================
 
+def build_calendar(days):
+    # calendar fields for datetime64[D] values
+    months = days.astype("datetime64[M]")
+    years = days.astype("datetime64[Y]")
+    day_num = days.astype(np.int64)
+
+    weekday = (day_num + 3) % 7  # 1970-01-01 was a Thursday; Monday = 0
+
+    # ISO week: the week belongs to the year its Thursday falls in
+    thursday = (day_num - weekday + 3).astype("datetime64[D]")
+    iso_jan1 = thursday.astype("datetime64[Y]").astype("datetime64[D]")
+    iso_week = (thursday - iso_jan1).astype(np.int64) // 7 + 1
+
+    return {
+        "year": years.astype(np.int64) + 1970,
+        "month": (months - years.astype("datetime64[M]")).astype(np.int64) + 1,
+        "day": (days - months.astype("datetime64[D]")).astype(np.int64) + 1,
+        "iso_week": iso_week,
+        "weekday": weekday,
+    }
+
+
+def build_buckets(ms, offset_ms=0):
+    # bucket start (epoch ms) per timeframe, for wall-clock time at
+    # UTC+offset; weeks start on Monday
+    local = ms + offset_ms
+    days = local // DAY_MS
+    weekday = (days + 3) % 7
+    month_days = (
+        days.astype("datetime64[D]")
+        .astype("datetime64[M]")
+        .astype("datetime64[D]")
+        .astype(np.int64)
+    )
+
+    return {
+        "1h": local - local % HOUR_MS - offset_ms,
+        "4h": local - local % (4 * HOUR_MS) - offset_ms,
+        "1d": days * DAY_MS - offset_ms,
+        "1w": (days - weekday) * DAY_MS - offset_ms,
+        "1mth": month_days * DAY_MS - offset_ms,
+    }
+
+
 def build_dim_time(timestamps):
-    rows = []
-
-    for ts in timestamps:
-        # normalize epoch (ms → sec if needed)
-        ts_sec = ts / 1000 if ts > 10_000_000_000 else ts
-
-        utc = datetime.fromtimestamp(ts_sec, tz=timezone.utc)
-        iso = utc.isocalendar()
-
-        hour = utc.hour
-
-        # killzone flags (UTC)
-        is_london_killzone = 7 <= hour < 10
-        is_ny_killzone = 12 <= hour < 15
-
-        # session overlaps
-        is_london_ny_overlap = 13 <= hour < 16
-
-        session = get_session(hour)
-
-        rows.append((
-            ts,                     # epoch (raw)
-            utc,                    # utc_timestamp
-            utc.date(),
-            utc.year,
-            utc.month,
-            utc.day,
-            utc.hour,
-            utc.minute,
-            iso.week,
-            utc.weekday(),
-            utc.weekday() >= 5,
-            session,
-            is_london_killzone,
-            is_ny_killzone,
-            is_london_ny_overlap
-        ))
-
-    return rows
+    """Build dim_time columns for epoch timestamps, one NumPy array each.
+
+    Calendar fields are computed once per distinct day and broadcast back;
+    session and flag columns are gathered from the 24-entry hour tables.
+    """
+    epoch = np.asarray(timestamps, dtype=np.int64)
+
+    # normalize epoch (sec → ms if needed)
+    ms = np.where(epoch > 10_000_000_000, epoch, epoch * 1000)
+    utc = ms.astype("datetime64[ms]")
+
+    days, day_idx = np.unique(utc.astype("datetime64[D]"), return_inverse=True)
+    calendar = build_calendar(days)
+
+    minute_of_day = (ms // INTERVAL_MS) % 1440
+    hour = minute_of_day // 60
+
+    # 1h and 4h boundaries coincide in UTC and UTC+8, so only the day-based
+    # buckets get a UTC+8 variant
+    utc_buckets = build_buckets(ms)
+    utc8_buckets = build_buckets(ms, UTC8_MS)
+
+    return {
+        "epoch": epoch,
+        "utc_timestamp": utc,
+        "date": days[day_idx],
+        "year": calendar["year"][day_idx].astype(np.int16),
+        "month": calendar["month"][day_idx].astype(np.int16),
+        "day": calendar["day"][day_idx].astype(np.int16),
+        "hour": hour.astype(np.int16),
+        "minute": (minute_of_day % 60).astype(np.int16),
+        "iso_week": calendar["iso_week"][day_idx].astype(np.int16),
+        "weekday": calendar["weekday"][day_idx].astype(np.int16),
+        "is_weekend": calendar["weekday"][day_idx] >= 5,
+        "session": SESSION_BY_HOUR[hour],
+        "is_london_killzone": LONDON_KILLZONE_BY_HOUR[hour],
+        "is_ny_killzone": NY_KILLZONE_BY_HOUR[hour],
+        "is_london_ny_overlap": LONDON_NY_OVERLAP_BY_HOUR[hour],
+        "bucket_1h": utc_buckets["1h"],
+        "bucket_4h": utc_buckets["4h"],
+        "bucket_1d": utc_buckets["1d"],
+        "bucket_1w": utc_buckets["1w"],
+        "bucket_1mth": utc_buckets["1mth"],
+        "bucket_1d_utc8": utc8_buckets["1d"],
+        "bucket_1w_utc8": utc8_buckets["1w"],
+        "bucket_1mth_utc8": utc8_buckets["1mth"],
+    }
 
 # =========================================================
 # INSERT INTO silver.dim_time
 # =========================================================
+DIM_TIME_COLUMNS = (
+    "epoch",
+    "utc_timestamp",
+    "date",
+    "year",
+    "month",
+    "day",
+    "hour",
+    "minute",
+    "iso_week",
+    "weekday",
+    "is_weekend",
+    "session",
+    "is_london_killzone",
+    "is_ny_killzone",
+    "is_london_ny_overlap",
+    "bucket_1h",
+    "bucket_4h",
+    "bucket_1d",
+    "bucket_1w",
+    "bucket_1mth",
+    "bucket_1d_utc8",
+    "bucket_1w_utc8",
+    "bucket_1mth_utc8",
+)
 
-def insert_into_dim_time(conn, rows):
-    with conn.cursor() as cur:
-        execute_batch(cur, """
-            INSERT INTO silver.dim_time (
-                epoch,
-                utc_timestamp,
-                date,
-                year,
-                month,
-                day,
-                hour,
-                minute,
-                iso_week,
-                weekday,
-                is_weekend,
-                session,
-                is_london_killzone,
-                is_ny_killzone
-                is_ny_london_overlap
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (epoch) DO NOTHING
-        """, rows, page_size=1000)
 
+def insert_into_dim_time(conn, dim):
+    # binary COPY needs fixed-width rows: one column set per session label
+    field_sets = []
+    for session in np.unique(dim["session"]):
+        mask = dim["session"] == session
+        field_sets.append([
+            str(session) if col == "session" else dim[col][mask]
+            for col in DIM_TIME_COLUMNS
+        ])
+
+    copy_merge_columns(
+        conn,
+        "silver.dim_time",
+        DIM_TIME_COLUMNS,
+        field_sets,
+        ("epoch",),
+    )
     conn.commit()
 
 
-def run():
-    conn = get_conn()
+def extend_dim_time(conn):
+    ranges = get_missing_ranges(*get_time_bounds(conn))
+
+    if not ranges:
+        print("[dim_time] no new timestamps")
+        return 0
 
-    raw_ts = get_distinct_timestamp(conn)
-    existing_ts = get_existing_dim_timestamps(conn)
+    total = 0
+    step = DIM_TIME_CHUNK * INTERVAL_MS
 
-    new_ts = [ts for ts in raw_ts if ts not in existing_ts]
+    for lo, hi in ranges:
+        for chunk_lo in range(lo, hi + 1, step):
+            chunk_hi = min(chunk_lo + step - INTERVAL_MS, hi)
+            dim = build_dim_time(np.arange(chunk_lo, chunk_hi + 1, INTERVAL_MS))
+            insert_into_dim_time(conn, dim)
+            total += len(dim["epoch"])
 
-    if not new_ts:
-        print("[dim_time] no new timestamps")
-        conn.close()
-        return
+    print(f"[dim_time] inserted {total} rows")
+    return total
 
-    rows = build_dim_time(new_ts)
-    insert_into_dim_time(conn, rows)
 
-    print(f"[dim_time] inserted {len(rows)} rows")
+def run():
+    conn = get_conn()
+    extend_dim_time(conn)
     conn.close()
 
 if __name__ == '__main__':
@@ -0,0 +1,144 @@
+import csv
+import io
+import struct
+import numpy as np
+
+# =========================================================
+# COPY → STAGING → MERGE
+# =========================================================
+#
+# Rows are streamed with COPY into a session-local temp table that mirrors
+# the target's columns, then merged with one set-based INSERT ... SELECT.
+# Nothing here commits: callers own the transaction, so side tables (e.g.
+# watermarks) can be updated atomically with the merge.
+
+
+def stage_name(table):
+    return "stage_" + table.replace(".", "_")
+
+
+def ensure_stage(cur, table, columns):
+    # CTAS drops NOT NULL/PK, so constant columns can be filled later.
+    # Temp tables live per connection; pooled connections keep theirs warm.
+    cur.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {stage_name(table)} AS
+        SELECT {", ".join(columns)}
+        FROM {table}
+        WITH NO DATA
+    """)
+
+
+def copy_merge_buffer(conn, table, columns, buf, conflict, format="csv", update=False):
+    """Merge a COPY buffer (already in `columns` order) into `table`.
+
+    `format` is "csv" or "binary". Existing keys are kept as they are,
+    or overwritten with `update=True`. Returns the number of rows written.
+    """
+    stage = stage_name(table)
+    cols = ", ".join(columns)
+
+    on_conflict = "DO NOTHING"
+    if update:
+        on_conflict = "DO UPDATE SET " + ", ".join(
+            f"{c} = EXCLUDED.{c}" for c in columns if c not in conflict
+        )
+
+    with conn.cursor() as cur:
+        ensure_stage(cur, table, columns)
+
+        cur.copy_expert(
+            f"COPY {stage} ({cols}) FROM STDIN WITH (FORMAT {format})",
+            buf,
+        )
+
+        cur.execute(f"""
+            INSERT INTO {table} ({cols})
+            SELECT {cols}
+            FROM {stage}
+            ON CONFLICT ({", ".join(conflict)}) {on_conflict}
+        """)
+        inserted = cur.rowcount
+
+        cur.execute(f"TRUNCATE {stage}")
+
+    return inserted
+
+
+def copy_merge(conn, table, columns, rows, conflict, update=False):
+    """COPY an iterable of row tuples into `table` via the staging path."""
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    buf.seek(0)
+
+    return copy_merge_buffer(conn, table, columns, buf, conflict, update=update)
+
+# =========================================================
+# BINARY COPY FROM COLUMNS
+# =========================================================
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+PGCOPY_TRAILER = struct.pack("!h", -1)
+PG_EPOCH = np.datetime64("2000-01-01")
+
+
+def _binary_field(f):
+    # numpy column → (big-endian wire dtype, byte width, wire values)
+    if isinstance(f, str):
+        f = f.encode()
+        return f"S{len(f)}", len(f), f
+
+    kind = f.dtype.kind
+    if kind == "M":
+        if np.datetime_data(f.dtype)[0] == "D":
+            # DATE: int32 days since 2000-01-01
+            return ">i4", 4, (f - PG_EPOCH).astype(np.int64)
+        # TIMESTAMP[TZ]: int64 microseconds since 2000-01-01 UTC
+        return ">i8", 8, (f.astype("datetime64[us]") - PG_EPOCH).astype(np.int64)
+    if kind == "b":
+        return "?", 1, f
+    if kind in "iu":
+        # int16/int32/int64 → SMALLINT/INTEGER/BIGINT
+        return f">i{f.dtype.itemsize}", f.dtype.itemsize, f
+    return ">f8", 8, f
+
+
+def pack_records(fields):
+    """Encode one column set as binary COPY tuples without per-row Python.
+
+    Each field is a NumPy column (int16/32/64, float64, bool, datetime64[D]
+    for DATE, any finer datetime64 for TIMESTAMPTZ) or a str constant
+    repeated on every row (TEXT). Every row has the same width, so the
+    whole set is one structured array; split varying TEXT columns into
+    several sets instead.
+    """
+    n = next(len(f) for f in fields if not isinstance(f, str))
+    dtype = [("nfields", ">i2")]
+    values = []
+
+    for i, f in enumerate(fields):
+        kind, width, f = _binary_field(f)
+        dtype += [(f"len{i}", ">i4"), (f"f{i}", kind)]
+        values.append((width, f))
+
+    rec = np.empty(n, dtype=dtype)
+    rec["nfields"] = len(fields)
+    for i, (width, f) in enumerate(values):
+        rec[f"len{i}"] = width
+        rec[f"f{i}"] = f
+
+    return rec.tobytes()
+
+
+def pack_binary(field_sets):
+    # column sets of different widths concatenate into one COPY stream
+    body = b"".join(pack_records(fields) for fields in field_sets)
+    return io.BytesIO(PGCOPY_HEADER + body + PGCOPY_TRAILER)
+
+
+def copy_merge_columns(conn, table, columns, field_sets, conflict, update=False):
+    """COPY one or more column sets (see pack_records) in a single merge."""
+    buf = pack_binary(field_sets)
+
+    return copy_merge_buffer(
+        conn, table, columns, buf, conflict, format="binary", update=update
+    )
@@ -0,0 +1,74 @@
+import threading
+
+# =========================================================
+# INSTRUMENT IDS
+# =========================================================
+#
+# Fact tables carry a 4-byte instrument_id instead of repeating symbol,
+# interval and exchange as TEXT on every row. Ids never change once
+# issued, so each process resolves an instrument once and caches it.
+
+_INSTRUMENT_IDS = {}
+_INSTRUMENT_IDS_LOCK = threading.Lock()
+
+
+def get_instrument_id(conn, symbol, interval, exchange):
+    """Resolve (symbol, interval, exchange) to its id, registering it once.
+
+    A newly registered instrument is committed straight away, before any
+    rows that use it, so a cached id always exists in the database; call
+    this before writing in the caller's transaction.
+    """
+    key = (symbol, interval, exchange)
+
+    with _INSTRUMENT_IDS_LOCK:
+        cached = _INSTRUMENT_IDS.get(key)
+    if cached is not None:
+        return cached
+
+    with conn.cursor() as cur:
+        cur.execute("""
+            WITH ins AS (
+                INSERT INTO silver.dim_instrument (symbol, interval, exchange)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (symbol, interval, exchange) DO NOTHING
+                RETURNING instrument_id
+            )
+            SELECT instrument_id FROM ins
+            UNION ALL
+            SELECT instrument_id
+            FROM silver.dim_instrument
+            WHERE symbol = %s
+              AND interval = %s
+              AND exchange = %s
+        """, key + key)
+        row = cur.fetchone()
+
+        if row is None:
+            # registered by a concurrent transaction after our snapshot
+            cur.execute("""
+                SELECT instrument_id
+                FROM silver.dim_instrument
+                WHERE symbol = %s
+                  AND interval = %s
+                  AND exchange = %s
+            """, key)
+            row = cur.fetchone()
+        instrument_id = row[0]
+    conn.commit()
+
+    with _INSTRUMENT_IDS_LOCK:
+        _INSTRUMENT_IDS[key] = instrument_id
+    return instrument_id
+
+
+def encode_rows(conn, rows):
+    # (timestamp, o, h, l, c, v, symbol, interval, exchange) rows →
+    # (timestamp, o, h, l, c, v, instrument_id)
+    ids = {}
+    for row in rows:
+        key = row[6:9]
+        if key not in ids:
+            ids[key] = get_instrument_id(conn, *key)
+
+    return [row[:6] + (ids[row[6:9]],) for row in rows]
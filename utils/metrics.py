@@ -0,0 +1,281 @@
+import json
+from bisect import bisect_left
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from dotenv import load_dotenv
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from psycopg2.extensions import cursor as _cursor
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+load_dotenv(BASE_DIR / "config" / "setting.env")
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_FILE = os.getenv("METRICS_FILE")             # textfile-collector .prom
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))     # 0: no HTTP endpoint
+METRICS_LOG = os.getenv("METRICS_LOG")               # JSON lines; default stderr
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", 15))  # textfile period, s
+
+# =========================================================
+# REGISTRY
+# =========================================================
+#
+# In-process counters, gauges and histograms, rendered in the Prometheus
+# text format. With METRICS_ENABLED off every recording call returns
+# straight away and database cursors are the plain psycopg2 ones, so the
+# instrumented hot paths cost a flag check.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_METRICS = {}  # name → (kind, {labels: value, or [bucket hits, sum, count]})
+_METRICS_LOCK = threading.Lock()
+_NULL = nullcontext()
+
+
+def _series(name, kind, labels):
+    key = tuple(sorted(labels.items()))
+    series = _METRICS.setdefault(name, (kind, {}))[1]
+    return series, key
+
+
+def inc(name, value=1, **labels):
+    if not METRICS_ENABLED:
+        return
+    with _METRICS_LOCK:
+        series, key = _series(name, "counter", labels)
+        series[key] = series.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    if not METRICS_ENABLED:
+        return
+    with _METRICS_LOCK:
+        series, key = _series(name, "gauge", labels)
+        series[key] = value
+
+
+def observe(name, value, **labels):
+    if not METRICS_ENABLED:
+        return
+    with _METRICS_LOCK:
+        series, key = _series(name, "histogram", labels)
+        hist = series.get(key)
+        if hist is None:
+            # per-bucket counts plus overflow; cumulated when rendered
+            hist = series[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+        hist[0][bisect_left(LATENCY_BUCKETS, value)] += 1
+        hist[1] += value
+        hist[2] += 1
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "t0")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.t0, **self.labels)
+
+
+def timed(name, **labels):
+    # `with timed("x_seconds", stage="..."):` → histogram observation
+    if not METRICS_ENABLED:
+        return _NULL
+    return _Timer(name, labels)
+
+
+def record_stage(stage, rows, seconds):
+    # one finished unit of work: duration, rows and a JSON log line
+    if not METRICS_ENABLED:
+        return
+    observe("stage_seconds", seconds, stage=stage)
+    inc("stage_rows_total", rows, stage=stage)
+    log(
+        "stage",
+        stage=stage,
+        rows=rows,
+        seconds=round(seconds, 6),
+        rows_per_sec=round(rows / seconds, 1) if seconds > 0 else None,
+    )
+
+# =========================================================
+# DB STATEMENTS
+# =========================================================
+
+# the written table wins over the first table read
+_STATEMENT_TABLE = re.compile(
+    r"\b(?:INTO|UPDATE|TABLE|VIEW)\s+(?:IF\s+NOT\s+EXISTS\s+)?([\w.]+)|\bFROM\s+([\w.]+)",
+    re.I,
+)
+_CTE_VERB = re.compile(r"\b(INSERT|UPDATE|DELETE)\b", re.I)
+
+
+def statement_label(query):
+    # "INSERT silver.fact_candles", "SELECT bronze.raw_ohlc", "COPY stage_…"
+    if not isinstance(query, str):
+        return "other"
+    words = query.split(None, 2)
+    if not words:
+        return "other"
+
+    verb = words[0].upper()
+    if verb == "WITH":
+        m = _CTE_VERB.search(query)
+        verb = m[1].upper() if m else "SELECT"
+
+    target = None
+    if verb == "COPY" and len(words) > 1 and not words[1].startswith("("):
+        target = words[1]
+    else:
+        for m in _STATEMENT_TABLE.finditer(query):
+            if m[1]:
+                target = m[1]
+                break
+            target = target or m[2]
+    return f"{verb} {target}" if target else verb
+
+
+class TimedCursor(_cursor):
+    """psycopg2 cursor recording db_statement_seconds per statement label."""
+
+    def execute(self, query, vars=None):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            observe("db_statement_seconds", time.perf_counter() - t0,
+                    statement=statement_label(query))
+
+    def copy_expert(self, sql, file, size=8192):
+        t0 = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            observe("db_statement_seconds", time.perf_counter() - t0,
+                    statement=statement_label(sql))
+
+
+def cursor_factory():
+    # for psycopg2.connect / pools: plain cursors unless metrics are on
+    return TimedCursor if METRICS_ENABLED else None
+
+# =========================================================
+# EXPOSITION
+# =========================================================
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key, extra=()):
+    pairs = [*key, *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render():
+    """The registry in the Prometheus text exposition format."""
+    lines = []
+    with _METRICS_LOCK:
+        for name in sorted(_METRICS):
+            kind, series = _METRICS[name]
+            lines.append(f"# TYPE {name} {kind}")
+
+            for key, value in sorted(series.items()):
+                if kind != "histogram":
+                    lines.append(f"{name}{_labels(key)} {value}")
+                    continue
+
+                buckets, total, count = value
+                n = 0
+                for bound, hits in zip(LATENCY_BUCKETS, buckets):
+                    n += hits
+                    lines.append(f"{name}_bucket{_labels(key, [('le', bound)])} {n}")
+                lines.append(f"{name}_bucket{_labels(key, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{_labels(key)} {total}")
+                lines.append(f"{name}_count{_labels(key)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path=METRICS_FILE):
+    # atomic, so a collector never reads half a file
+    if not METRICS_ENABLED or not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+def write_textfile_every(interval=METRICS_INTERVAL, path=METRICS_FILE):
+    """Rewrite the textfile every `interval` seconds from a daemon thread,
+    for processes that never finish. Returns the thread, or None."""
+    if not METRICS_ENABLED or not path:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            write_textfile(path)
+
+    thread = threading.Thread(target=loop, name="metrics-textfile", daemon=True)
+    thread.start()
+    return thread
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port=METRICS_PORT):
+    """Serve /metrics from a daemon thread. Returns the server, or None."""
+    if not METRICS_ENABLED or not port:
+        return None
+    server = ThreadingHTTPServer(("", port), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+# =========================================================
+# JSON LOGS
+# =========================================================
+
+_LOG = None
+_LOG_LOCK = threading.Lock()
+
+
+def log(event, **fields):
+    # one JSON object per line, to METRICS_LOG or stderr
+    global _LOG
+    if not METRICS_ENABLED:
+        return
+    line = json.dumps({"ts": round(time.time(), 3), "event": event, **fields})
+
+    with _LOG_LOCK:
+        if _LOG is None:
+            _LOG = open(METRICS_LOG, "a", buffering=1) if METRICS_LOG else sys.stderr
+        _LOG.write(line + "\n")
+        _LOG.flush()
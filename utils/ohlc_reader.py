@@ -0,0 +1,334 @@
+import io
+import psycopg2
+import os
+import sys
+import threading
+import numpy as np
+from collections import OrderedDict
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from pathlib import Path
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BASE_DIR))
+load_dotenv(BASE_DIR / "config" / "setting.env")
+
+from utils.bulk_loader import PGCOPY_TRAILER, PG_EPOCH
+from aggregation.mv_ohlc import TIMEFRAMES
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: NumPy results work without it
+    pa = pq = None
+
+DB_PARAMS = {
+    "dbname": os.getenv("DB_NAME"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host": os.getenv("DB_HOST"),
+    "port": os.getenv("DB_PORT"),
+}
+
+def get_conn():
+    return psycopg2.connect(**DB_PARAMS)
+
+OHLC_CACHE_MB = float(os.getenv("OHLC_CACHE_MB", 256))
+EXPORT_DIR = BASE_DIR / os.getenv("EXPORT_DIR", "data/gold")  # relative to the repo root
+
+# =========================================================
+# BINARY COPY → NUMPY
+# =========================================================
+
+OHLC_COLUMNS = (
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "pct_change",
+    "log_return",
+    "volatility",
+    "vwap",
+    "atr",
+    "rolling_volume",
+)
+
+
+def decode_records(payload, n_floats):
+    """Decode a binary COPY of (timestamptz, float8 * n_floats) rows.
+
+    NULLs must be mapped to NaN in the query, so every row has the same
+    width and the body is read as one structured array.
+    """
+    view = memoryview(payload)
+    ext_len = int.from_bytes(view[15:19], "big")
+    body = view[19 + ext_len:len(view) - len(PGCOPY_TRAILER)]
+
+    dtype = [("nfields", ">i2"), ("len0", ">i4"), ("f0", ">i8")]
+    for i in range(1, n_floats + 1):
+        dtype += [(f"len{i}", ">i4"), (f"f{i}", ">f8")]
+
+    rec = np.frombuffer(body, dtype=np.dtype(dtype))
+    columns = {
+        "tf_time": PG_EPOCH.astype("datetime64[us]")
+        + rec["f0"].astype("timedelta64[us]"),
+    }
+    for i, name in enumerate(OHLC_COLUMNS[:n_floats], start=1):
+        columns[name] = rec[f"f{i}"].astype(np.float64)
+    return columns
+
+# =========================================================
+# CACHE
+# =========================================================
+#
+# Entries are keyed on (symbol, exchange, tf, start_ms, end_ms). A range
+# that ended before the bar still open when it was read only changes when
+# a gap repair or backfill rewinds the instrument, so it is revalidated
+# against the feature watermark's revision alone; other ranges are re-read
+# once the feature watermark for their instrument moves.
+
+class OhlcCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        # callers share the cached arrays, so they are made read-only
+        for a in entry["columns"].values():
+            a.flags.writeable = False
+        nbytes = sum(a.nbytes for a in entry["columns"].values())
+        if nbytes > self.max_bytes:
+            return
+
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old["nbytes"]
+
+            entry["nbytes"] = nbytes
+            self.entries[key] = entry
+            self.size += nbytes
+
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted["nbytes"]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+
+_CACHE = OhlcCache(int(OHLC_CACHE_MB * 1024 * 1024))
+_CONN = None
+_CONN_LOCK = threading.Lock()
+
+
+def clear_cache():
+    _CACHE.clear()
+
+
+def _shared_conn():
+    # autocommit, so every watermark check sees the latest commit
+    global _CONN
+    if _CONN is None or _CONN.closed:
+        _CONN = get_conn()
+        _CONN.autocommit = True
+    return _CONN
+
+# =========================================================
+# READ
+# =========================================================
+
+def to_ms(value):
+    # epoch ms, datetime (naive = UTC) or ISO string → epoch ms
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def get_freshness(cur, symbol, exchange, tf):
+    # (feature watermark, start of the bucket it falls in, revision); the
+    # first two in epoch ms
+    cur.execute(f"""
+        SELECT g.last_timestamp, t.{TIMEFRAMES[tf]["key"]}, g.revision
+        FROM gold.feature_watermark g
+        LEFT JOIN silver.dim_time t
+          ON t.epoch = g.last_timestamp
+        WHERE g.symbol = %s
+          AND g.exchange = %s
+          AND g.timeframe = %s
+    """, (symbol, exchange, tf))
+    return cur.fetchone() or (None, None, None)
+
+
+def get_revision(cur, symbol, exchange, tf):
+    cur.execute("""
+        SELECT revision
+        FROM gold.feature_watermark
+        WHERE symbol = %s
+          AND exchange = %s
+          AND timeframe = %s
+    """, (symbol, exchange, tf))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def fetch_ohlc(cur, symbol, exchange, tf, start_ms, end_ms):
+    # one binary COPY of the range, decoded without per-row Python
+    floats = ", ".join(f"COALESCE({c}, 'NaN')" for c in OHLC_COLUMNS)
+    query = cur.mogrify(f"""
+        SELECT tf_time, {floats}
+        FROM gold.features_{tf}
+        WHERE symbol = %(symbol)s
+          AND exchange = %(exchange)s
+          AND (%(start)s IS NULL OR tf_time >= to_timestamp(%(start)s / 1000.0))
+          AND (%(end)s IS NULL OR tf_time <= to_timestamp(%(end)s / 1000.0))
+        ORDER BY tf_time
+    """, {
+        "symbol": symbol,
+        "exchange": exchange,
+        "start": start_ms,
+        "end": end_ms,
+    }).decode()
+
+    buf = io.BytesIO()
+    cur.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT binary)", buf)
+    return decode_records(buf.getbuffer(), len(OHLC_COLUMNS))
+
+
+def get_ohlc(symbol, exchange, tf, start=None, end=None, arrow=False):
+    """Bars of `tf` for one instrument with tf_time in [start, end].
+
+    Returns a dict of NumPy arrays (tf_time as datetime64[us] UTC, the
+    OHLCV and gold feature columns as float64 with NaN for missing), or a
+    pyarrow Table with `arrow=True`. Results are cached, see OhlcCache.
+    """
+    if tf not in TIMEFRAMES:
+        raise ValueError(f"unknown timeframe {tf!r}")
+    if arrow and pa is None:
+        raise ImportError("arrow=True needs pyarrow installed")
+
+    start_ms, end_ms = to_ms(start), to_ms(end)
+    key = (symbol, exchange, tf, start_ms, end_ms)
+    entry = _CACHE.get(key)
+
+    with _CONN_LOCK:
+        with _shared_conn().cursor() as cur:
+            # closed bars: one primary-key lookup
+            if (
+                entry is not None
+                and entry["closed"]
+                and get_revision(cur, symbol, exchange, tf) != entry["revision"]
+            ):
+                entry = None
+
+            if entry is None or not entry["closed"]:
+                watermark, open_bucket, revision = get_freshness(cur, symbol, exchange, tf)
+
+                if (
+                    entry is None
+                    or entry["watermark"] != watermark
+                    or entry["revision"] != revision
+                ):
+                    entry = {
+                        "columns": fetch_ohlc(cur, symbol, exchange, tf, start_ms, end_ms),
+                        "watermark": watermark,
+                        "revision": revision,
+                        "closed": (
+                            end_ms is not None
+                            and open_bucket is not None
+                            and end_ms < open_bucket
+                        ),
+                    }
+                    _CACHE.put(key, entry)
+
+    if arrow:
+        return to_arrow(entry["columns"])
+    return entry["columns"]
+
+
+def to_arrow(columns):
+    # the export's schema: tf_time is UTC, so both sources concat and compare
+    return pa.table({
+        "tf_time": pa.array(columns["tf_time"], pa.timestamp("us", tz="UTC")),
+        **{c: pa.array(columns[c]) for c in OHLC_COLUMNS},
+    })
+
+# =========================================================
+# PARQUET EXPORT
+# =========================================================
+#
+# aggregation/gold_export.py writes closed bars to one Parquet file per
+# UTC month, hive-style, so pyarrow.dataset can also read the tree:
+#   EXPORT_DIR/<tf>/symbol=<symbol>/exchange=<exchange>/month=YYYY-MM/bars.parquet
+
+def export_dir(tf, symbol, exchange):
+    return EXPORT_DIR / tf / f"symbol={symbol}" / f"exchange={exchange}"
+
+
+def export_path(tf, symbol, exchange, month):
+    # month as "YYYY-MM"
+    return export_dir(tf, symbol, exchange) / f"month={month}" / "bars.parquet"
+
+
+def read_export(symbol, exchange, tf, start=None, end=None, arrow=False):
+    """Exported bars of `tf` for one instrument with tf_time in [start, end].
+
+    Same result shape as get_ohlc, read from the Parquet export instead of
+    the database. Files are memory-mapped and only the months overlapping
+    the range are opened. Bars newer than the last export are not included.
+    """
+    if pq is None:
+        raise ImportError("read_export needs pyarrow installed")
+
+    start_ms, end_ms = to_ms(start), to_ms(end)
+    first = None if start_ms is None else np.datetime64(start_ms, "ms")
+    last = None if end_ms is None else np.datetime64(end_ms, "ms")
+
+    tables = []
+    for path in sorted(export_dir(tf, symbol, exchange).glob("month=*/bars.parquet")):
+        month = np.datetime64(path.parent.name[len("month="):], "M")
+        if first is not None and month + 1 <= first:
+            continue
+        if last is not None and month > last:
+            continue
+        tables.append(pq.read_table(path, memory_map=True))
+
+    if tables:
+        table = pa.concat_tables(tables)
+    else:
+        table = pa.table({
+            "tf_time": pa.array([], pa.timestamp("us", tz="UTC")),
+            **{c: pa.array([], pa.float64()) for c in OHLC_COLUMNS},
+        })
+
+    # files are written in tf_time order, so the range is a slice
+    tf_time = table["tf_time"].to_numpy().astype("datetime64[us]")
+    lo = 0 if first is None else np.searchsorted(tf_time, first, "left")
+    hi = len(tf_time) if last is None else np.searchsorted(tf_time, last, "right")
+    table = table.slice(lo, hi - lo)
+
+    if arrow:
+        return table
+    return {
+        name: table[name].to_numpy().astype("datetime64[us]" if name == "tf_time" else np.float64)
+        for name in table.column_names
+    }
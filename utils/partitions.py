@@ -0,0 +1,270 @@
+import argparse
+import psycopg2
+import os
+import re
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from pathlib import Path
+
+# =========================================================
+# ENV
+# =========================================================
+BASE_DIR = Path(__file__).resolve().parents[1]
+load_dotenv(BASE_DIR / "config" / "setting.env")
+
+DB_PARAMS = {
+    "dbname": os.getenv("DB_NAME"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASSWORD"),
+    "host": os.getenv("DB_HOST"),
+    "port": os.getenv("DB_PORT"),
+}
+
+def get_conn():
+    return psycopg2.connect(**DB_PARAMS)
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+
+# =========================================================
+# MONTHLY PARTITIONS
+# =========================================================
+#
+# bronze.raw_ohlc and silver.fact_candles are range-partitioned on epoch
+# ms, one partition per UTC month, named <table>_pYYYY_MM. Like the bulk
+# loader, nothing here commits: callers own the transaction.
+
+PARTITIONED_TABLES = {
+    "bronze.raw_ohlc": BASE_DIR / "db" / "bronze" / "bronze.sql",
+    "silver.fact_candles": BASE_DIR / "db" / "silver" / "silver.sql",
+}
+SCHEME_SQL = BASE_DIR / "db" / "scheme.sql"
+
+CANDLE_COLUMNS = ("timestamp", "open", "high", "low", "close", "volume")
+
+PARTITION_SUFFIX = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def month_start(ts_ms):
+    t = datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc)
+    return datetime(t.year, t.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(t):
+    return t.replace(year=t.year + t.month // 12, month=t.month % 12 + 1)
+
+
+def to_ms(t):
+    return int(t.timestamp() * 1000)
+
+
+def is_partitioned(cur, table):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", (table,))
+    return cur.fetchone()[0] == "p"
+
+
+def list_partitions(cur, table):
+    # {partition name: (lo_ms, hi_ms)}, parsed from the naming scheme
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """, (table,))
+
+    parts = {}
+    for (name,) in cur.fetchall():
+        m = PARTITION_SUFFIX.search(name)
+        if m:
+            lo = datetime(int(m[1]), int(m[2]), 1, tzinfo=timezone.utc)
+            parts[name] = (to_ms(lo), to_ms(next_month(lo)))
+    return parts
+
+
+def ensure_partitions(conn, start_ms, end_ms, ahead=PARTITION_MONTHS_AHEAD):
+    """Create the monthly partitions covering [start_ms, end_ms] plus
+    `ahead` months, on every partitioned table. Returns the names created.
+    """
+    created = []
+    last = month_start(end_ms)
+    for _ in range(ahead):
+        last = next_month(last)
+
+    with conn.cursor() as cur:
+        for table in PARTITIONED_TABLES:
+            # a heap table still waiting for `convert` is left alone
+            if not is_partitioned(cur, table):
+                continue
+
+            schema, name = table.split(".")
+            existing = list_partitions(cur, table)
+
+            month = month_start(start_ms)
+            while month <= last:
+                part = f"{name}_p{month:%Y_%m}"
+                if part not in existing:
+                    cur.execute(f"""
+                        CREATE TABLE IF NOT EXISTS {schema}.{part}
+                        PARTITION OF {table}
+                        FOR VALUES FROM ({to_ms(month)}) TO ({to_ms(next_month(month))})
+                    """)
+                    created.append(f"{schema}.{part}")
+                month = next_month(month)
+
+    return created
+
+
+def detach_partitions(conn, before_ms, archive_schema=None):
+    """Detach every partition that ends at or before `before_ms`.
+
+    Bronze months are only detached once silver has promoted past them.
+    Detached partitions stay queryable as plain tables, optionally moved to
+    `archive_schema`, for dumping or dropping. Returns the names detached.
+    """
+    detached = []
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT MIN(last_timestamp) FROM silver.promote_watermark")
+        promoted = cur.fetchone()[0]
+
+        if archive_schema:
+            cur.execute(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}")
+
+        for table in PARTITIONED_TABLES:
+            if not is_partitioned(cur, table):
+                continue
+
+            schema = table.split(".")[0]
+            cutoff = before_ms
+            if schema == "bronze":
+                cutoff = min(before_ms, promoted + 1) if promoted is not None else 0
+
+            for part, (_, hi) in sorted(list_partitions(cur, table).items()):
+                if hi > cutoff:
+                    continue
+
+                cur.execute(f"ALTER TABLE {table} DETACH PARTITION {schema}.{part}")
+                if archive_schema:
+                    cur.execute(f"ALTER TABLE {schema}.{part} SET SCHEMA {archive_schema}")
+                    detached.append(f"{archive_schema}.{part}")
+                else:
+                    detached.append(f"{schema}.{part}")
+
+    return detached
+
+
+def is_current(cur, table):
+    # partitioned and keyed on instrument_id
+    cur.execute("""
+        SELECT c.relkind = 'p' AND EXISTS (
+            SELECT 1
+            FROM pg_attribute a
+            WHERE a.attrelid = c.oid
+              AND a.attname = 'instrument_id'
+              AND NOT a.attisdropped
+        )
+        FROM pg_class c
+        WHERE c.oid = %s::regclass
+    """, (table,))
+    return cur.fetchone()[0]
+
+
+def convert_table(conn, table):
+    """Swap an older layout of `table` for its current definition.
+
+    Covers the plain heap table and the partitioned one keyed on the
+    (symbol, interval, exchange) TEXT columns. The old table and its
+    partitions are renamed aside, the schema files are re-applied to
+    create the new table and re-point views, instruments are registered,
+    the rows are copied over with their ids and the old table is dropped,
+    all in the caller's transaction. Returns the number of rows moved, or
+    None if already current.
+    """
+    schema, name = table.split(".")
+    old = f"{name}_heap"
+    cols = ", ".join(CANDLE_COLUMNS)
+
+    with conn.cursor() as cur:
+        if is_current(cur, table):
+            return None
+
+        if is_partitioned(cur, table):
+            for part in list_partitions(cur, table):
+                cur.execute(f"ALTER TABLE {schema}.{part} RENAME TO {old}{part[len(name):]}")
+
+        cur.execute(f"ALTER TABLE {table} RENAME TO {old}")
+        cur.execute(f"ALTER TABLE {schema}.{old} RENAME CONSTRAINT {name}_pkey TO {old}_pkey")
+        cur.execute(f"ALTER INDEX IF EXISTS {schema}.{name}_timestamp_brin RENAME TO {old}_timestamp_brin")
+
+        cur.execute(SCHEME_SQL.read_text())
+        cur.execute(PARTITIONED_TABLES[table].read_text())
+
+        cur.execute(f"SELECT MIN(timestamp), MAX(timestamp) FROM {schema}.{old}")
+        lo, hi = cur.fetchone()
+        if lo is not None:
+            ensure_partitions(conn, lo, hi)
+
+        cur.execute(f"""
+            INSERT INTO silver.dim_instrument (symbol, interval, exchange)
+            SELECT DISTINCT symbol, interval, exchange
+            FROM {schema}.{old}
+            ON CONFLICT (symbol, interval, exchange) DO NOTHING
+        """)
+        cur.execute(f"""
+            INSERT INTO {table} ({cols}, instrument_id)
+            SELECT {", ".join("o." + c for c in CANDLE_COLUMNS)}, i.instrument_id
+            FROM {schema}.{old} o
+            JOIN silver.dim_instrument i
+              USING (symbol, interval, exchange)
+        """)
+        moved = cur.rowcount
+        cur.execute(f"DROP TABLE {schema}.{old}")
+
+    return moved
+
+# =========================================================
+# MAIN
+# =========================================================
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="monthly partition manager")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ensure = sub.add_parser("ensure", help="pre-create partitions up to N months ahead")
+    ensure.add_argument("--ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+
+    detach = sub.add_parser("detach", help="detach partitions older than a month")
+    detach.add_argument("--before", required=True, help="first month kept, YYYY-MM")
+    detach.add_argument("--archive", help="schema to move detached partitions to")
+
+    sub.add_parser("convert", help="migrate older table layouts to the current one")
+    return parser.parse_args()
+
+
+def run():
+    args = parse_args()
+    conn = get_conn()
+
+    if args.command == "ensure":
+        now = to_ms(datetime.now(timezone.utc))
+        for part in ensure_partitions(conn, now, now, args.ahead):
+            print(f"[partitions] created {part}")
+
+    elif args.command == "detach":
+        before = datetime.strptime(args.before, "%Y-%m").replace(tzinfo=timezone.utc)
+        for part in detach_partitions(conn, to_ms(before), args.archive):
+            print(f"[partitions] detached {part}")
+
+    elif args.command == "convert":
+        for table in PARTITIONED_TABLES:
+            moved = convert_table(conn, table)
+            if moved is None:
+                print(f"[partitions] {table} already current")
+            else:
+                print(f"[partitions] {table}: moved {moved} rows")
+
+    conn.commit()
+    conn.close()
+
+
+if __name__ == "__main__":
+    run()